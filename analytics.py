@@ -0,0 +1,266 @@
+import argparse
+import json
+import sqlite3
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from dates import DAY_SECONDS, from_day
+from money import CENT, from_cents
+from occupancy import OccupancyEngine
+
+# Columns added to the analytics table for the daily rollups
+ROLLUP_COLUMNS = [
+    ('occupied_rooms', 'INTEGER'),
+    ('bills_count', 'INTEGER'),
+    ('bills_total', 'REAL'),
+    ('bills_tax', 'REAL'),
+    ('bills_discount', 'REAL'),
+]
+
+SUM_FIELDS = ('total_bookings', 'total_revenue', 'occupied_rooms',
+              'bills_count', 'bills_total', 'bills_tax', 'bills_discount')
+
+
+def add_rollup_columns(cursor):
+    # Returns True when the columns were added, i.e. the rollups need a backfill
+    existing = {row[1] for row in cursor.execute('PRAGMA table_info(analytics)')}
+    missing = [(name, kind) for name, kind in ROLLUP_COLUMNS if name not in existing]
+    for name, kind in missing:
+        cursor.execute(f'ALTER TABLE analytics ADD COLUMN {name} {kind} DEFAULT 0')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_analytics_date ON analytics (date)')
+    return bool(missing)
+
+
+def day_key(value):
+    # 'YYYY-MM-DD' for date/datetime objects or stored timestamp strings
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return str(value)[:10]
+
+
+def _day_range(start, end):
+    # Inclusive days start..end as the half-open ['start', 'day after end')
+    end = date.fromisoformat(day_key(end)) + timedelta(days=1)
+    return day_key(start), end.isoformat()
+
+
+def _new_delta():
+    delta = dict.fromkeys(SUM_FIELDS, 0)
+    delta['room_types'] = Counter()
+    delta['payment_methods'] = Counter()
+    return delta
+
+
+# Per-day aggregates in the analytics table, updated in the same
+# transaction as each booking/bill write so reports read a few rows.
+# Amounts are integer cents, like the source tables.
+class AnalyticsRollup:
+    def __init__(self, conn, read_conn=None):
+        self.conn = conn
+        self.read_conn = read_conn or conn
+
+    # Writes
+    def record_bookings(self, bookings):
+        # bookings: (booking_date, total_amount, room_type, check_in_date, check_out_date)
+        deltas = defaultdict(_new_delta)
+        for booking_date, total_amount, room_type, check_in, check_out in bookings:
+            delta = deltas[day_key(booking_date)]
+            delta['total_bookings'] += 1
+            delta['total_revenue'] += total_amount or 0
+            delta['room_types'][room_type or 'Unknown'] += 1
+            self._add_nights(deltas, check_in, check_out)
+        self._apply(deltas)
+
+    def record_bills(self, bills):
+        # bills: (bill_date, total_amount, tax_amount, discount_amount, payment_method)
+        deltas = defaultdict(_new_delta)
+        for bill_date, total_amount, tax_amount, discount_amount, payment_method in bills:
+            delta = deltas[day_key(bill_date)]
+            delta['bills_count'] += 1
+            delta['bills_total'] += total_amount or 0
+            delta['bills_tax'] += tax_amount or 0
+            delta['bills_discount'] += discount_amount or 0
+            delta['payment_methods'][payment_method or 'Unknown'] += 1
+        self._apply(deltas)
+
+    def rebuild(self):
+        # Recompute every day from the source tables
+        deltas = defaultdict(_new_delta)
+        rows = self.conn.execute(f'''
+            SELECT b.booking_date / {DAY_SECONDS}, r.room_type, COUNT(*), SUM(b.total_amount)
+            FROM bookings b
+            LEFT JOIN rooms r ON r.room_number = b.room_number
+            WHERE b.booking_date IS NOT NULL
+            GROUP BY 1, 2
+        ''')
+        for day, room_type, count, revenue in rows:
+            delta = deltas[from_day(day).isoformat()]
+            delta['total_bookings'] += count
+            delta['total_revenue'] += revenue or 0
+            delta['room_types'][room_type or 'Unknown'] += count
+
+        first_night, last_checkout = self.conn.execute(
+            'SELECT MIN(check_in_date), MAX(check_out_date) FROM bookings'
+        ).fetchone()
+        if first_night is not None and last_checkout is not None:
+            for day, occupied, _ in OccupancyEngine(self.conn).daily(from_day(first_night),
+                                                                      from_day(last_checkout)):
+                if occupied:
+                    deltas[day.isoformat()]['occupied_rooms'] += occupied
+
+        rows = self.conn.execute('''
+            SELECT substr(bill_date, 1, 10), payment_method, COUNT(*),
+                   SUM(total_amount), SUM(tax_amount), SUM(discount_amount)
+            FROM bills
+            GROUP BY 1, 2
+        ''')
+        for day, payment_method, count, total, tax, discount in rows:
+            delta = deltas[day]
+            delta['bills_count'] += count
+            delta['bills_total'] += total or 0
+            delta['bills_tax'] += tax or 0
+            delta['bills_discount'] += discount or 0
+            delta['payment_methods'][payment_method or 'Unknown'] += count
+
+        self.conn.execute('DELETE FROM analytics')
+        self._apply(deltas)
+
+    def _add_nights(self, deltas, check_in, check_out):
+        try:
+            night = datetime.strptime(day_key(check_in), '%Y-%m-%d').date()
+            check_out = datetime.strptime(day_key(check_out), '%Y-%m-%d').date()
+        except ValueError:
+            return
+        while night < check_out:
+            deltas[night.isoformat()]['occupied_rooms'] += 1
+            night += timedelta(days=1)
+
+    def _apply(self, deltas):
+        if not deltas:
+            return
+        days = sorted(deltas)
+        existing = {}
+        for i in range(0, len(days), 500):
+            chunk = days[i:i + 500]
+            rows = self.conn.execute(f'''
+                SELECT date, {', '.join(SUM_FIELDS)}, room_type_distribution, payment_method_distribution
+                FROM analytics
+                WHERE date IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            for row in rows:
+                existing[row[0]] = row[1:]
+
+        room_count = self.conn.execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+        records = []
+        for day in days:
+            delta = deltas[day]
+            current = existing.get(day)
+            if current:
+                totals = [(value or 0) + delta[field] for field, value in zip(SUM_FIELDS, current)]
+                room_types = Counter(json.loads(current[-2] or '{}')) + delta['room_types']
+                payment_methods = Counter(json.loads(current[-1] or '{}')) + delta['payment_methods']
+            else:
+                totals = [delta[field] for field in SUM_FIELDS]
+                room_types = delta['room_types']
+                payment_methods = delta['payment_methods']
+
+            values = dict(zip(SUM_FIELDS, totals))
+            bookings = values['total_bookings']
+            records.append((
+                day,
+                *totals,
+                round(values['total_revenue'] / bookings) if bookings else 0,
+                values['occupied_rooms'] * 100.0 / room_count if room_count else 0,
+                json.dumps(dict(room_types), sort_keys=True),
+                json.dumps(dict(payment_methods), sort_keys=True)
+            ))
+
+        self.conn.executemany(f'''
+            INSERT INTO analytics (
+                date, {', '.join(SUM_FIELDS)}, average_booking_value, occupancy_rate,
+                room_type_distribution, payment_method_distribution
+            ) VALUES ({', '.join('?' * (len(SUM_FIELDS) + 5))})
+            ON CONFLICT (date) DO UPDATE SET
+                {', '.join(f'{field} = excluded.{field}' for field in SUM_FIELDS)},
+                average_booking_value = excluded.average_booking_value,
+                occupancy_rate = excluded.occupancy_rate,
+                room_type_distribution = excluded.room_type_distribution,
+                payment_method_distribution = excluded.payment_method_distribution
+        ''', records)
+
+    # Reads
+    def summary(self, start, end):
+        # (bookings, revenue, average booking value, occupancy %) for the
+        # days start..end inclusive
+        start, stop = _day_range(start, end)
+        bookings, revenue, occupied = self.read_conn.execute('''
+            SELECT SUM(total_bookings), SUM(total_revenue), SUM(occupied_rooms)
+            FROM analytics
+            WHERE date >= ? AND date < ?
+        ''', (start, stop)).fetchone()
+        room_count = self.read_conn.execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+        days = (date.fromisoformat(stop) - date.fromisoformat(start)).days
+        revenue = from_cents(revenue or 0)
+        return (
+            bookings or 0,
+            revenue,
+            (revenue / bookings).quantize(CENT) if bookings else revenue,
+            (occupied or 0) * 100.0 / (room_count * days) if room_count else 0
+        )
+
+    def monthly_bookings(self, since):
+        rows = self.read_conn.execute('''
+            SELECT substr(date, 1, 7) as month, SUM(total_bookings), SUM(total_revenue)
+            FROM analytics
+            WHERE date >= ?
+            GROUP BY month
+            HAVING SUM(total_bookings) > 0
+            ORDER BY month
+        ''', (day_key(since),))
+        return [(month, bookings, from_cents(revenue)) for month, bookings, revenue in rows]
+
+    def monthly_revenue(self, since):
+        rows = self.read_conn.execute('''
+            SELECT substr(date, 1, 7) as month, SUM(bills_total), SUM(bills_tax), SUM(bills_discount)
+            FROM analytics
+            WHERE date >= ?
+            GROUP BY month
+            HAVING SUM(bills_count) > 0
+            ORDER BY month
+        ''', (day_key(since),))
+        return [
+            (month, from_cents(total), from_cents(tax), from_cents(discount))
+            for month, total, tax, discount in rows
+        ]
+
+    def distributions(self, start, end):
+        room_types, payment_methods = Counter(), Counter()
+        rows = self.read_conn.execute('''
+            SELECT room_type_distribution, payment_method_distribution
+            FROM analytics
+            WHERE date >= ? AND date < ?
+        ''', _day_range(start, end))
+        for room_type_json, payment_json in rows:
+            room_types.update(json.loads(room_type_json or '{}'))
+            payment_methods.update(json.loads(payment_json or '{}'))
+        return dict(room_types), dict(payment_methods)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the daily analytics rollups")
+    parser.add_argument('--db', default='hotel.db', help="SQLite database (default: hotel.db)")
+    args = parser.parse_args(argv)
+
+    # Imported here: migrations itself builds on this module
+    from migrations import migrate
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    with conn:
+        AnalyticsRollup(conn).rebuild()
+    print(f"Rebuilt {conn.execute('SELECT COUNT(*) FROM analytics').fetchone()[0]} daily rollups")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+from database import ConnectionManager, DatabaseConfig
+from repository import ConflictError, HotelRepository, init_schema
+
+MAX_BODY = 1024 * 1024
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _plain(value):
+    # Records (namedtuples) as JSON objects rather than arrays
+    if hasattr(value, '_asdict'):
+        return {key: _plain(item) for key, item in value._asdict().items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_json(payload):
+    return json.dumps(_plain(payload), default=_json_default).encode('utf-8')
+
+
+def _body_field(body, name, required=True, default=None):
+    value = body.get(name, default)
+    if required and value in (None, ''):
+        raise HttpError(400, f"{name} is required")
+    return value
+
+
+# Per-route request counts and timings, served at GET /stats
+class RequestStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, status, seconds):
+        with self.lock:
+            stats = self.routes.setdefault(route, {'requests': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            stats['requests'] += 1
+            stats['errors'] += status >= 400
+            stats['total_ms'] += seconds * 1000
+            stats['max_ms'] = max(stats['max_ms'], seconds * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                route: dict(stats, avg_ms=stats['total_ms'] / stats['requests'])
+                for route, stats in self.routes.items()
+            }
+
+
+# JSON API over the same database as the GUI. Requests are parsed on the
+# asyncio loop and run on a thread pool; each pool thread keeps its own
+# repository (SQLite connections belong to the thread that opened them), so
+# the pool doubles as the connection pool.
+class ApiServer:
+    def __init__(self, config, workers=8):
+        self.config = config
+        self.manager = ConnectionManager(config)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self.stats = RequestStats()
+        self._local = threading.local()
+        self.routes = [
+            ('GET', r'/rooms', self.list_rooms),
+            ('GET', r'/rooms/available', self.available_rooms),
+            ('GET', r'/bookings', self.list_bookings),
+            ('POST', r'/bookings', self.create_booking),
+            ('GET', r'/bookings/(\d+)/folio', self.get_folio),
+            ('POST', r'/bookings/(\d+)/bill', self.create_bill),
+            ('GET', r'/services', self.list_services),
+            ('POST', r'/service-requests', self.create_service_request),
+            ('GET', r'/stats', self.get_stats),
+        ]
+
+        # Bring the schema up to date once, before any worker connects
+        init_schema(self.manager.writer())
+        self.manager.close()
+
+    def repo(self):
+        local = self._local
+        if getattr(local, 'repo', None) is None:
+            local.repo = HotelRepository(self.manager.writer(), self.manager.reader())
+            local.version = local.repo.change_version()
+        else:
+            # Bookings made through other threads or terminals since the
+            # last request on this thread; keeps the availability index fresh
+            local.version, _ = local.repo.changes_since(local.version)
+        return local.repo
+
+    # Handlers: run on a pool thread, return (status, payload)
+    def list_rooms(self, query, body):
+        return 200, self.repo().list_rooms()
+
+    def available_rooms(self, query, body):
+        check_in, check_out = query.get('check_in'), query.get('check_out')
+        if not check_in or not check_out:
+            raise HttpError(400, "check_in and check_out are required")
+        repo = self.repo()
+        rooms = {room.room_number: room for room in repo.list_rooms()}
+        return 200, [rooms[number] for number in repo.free_rooms(check_in, check_out) if number in rooms]
+
+    def list_bookings(self, query, body):
+        repo = self.repo()
+        limit = min(int(query.get('limit', 100)), 1000)
+        after = query.get('after')
+        if query.get('q'):
+            return 200, repo.search_bookings(query['q'], after=int(after) if after else None, limit=limit)
+        # Keyset paging on (booking_date, id): pass the last row's values back
+        after_key = (query['after_date'], int(after)) if after and query.get('after_date') else None
+        return 200, repo.booking_page(after=after_key, limit=limit)
+
+    def create_booking(self, query, body):
+        booking_id, total_amount = self.repo().book_room(
+            str(_body_field(body, 'room_number')),
+            _body_field(body, 'customer_name'),
+            _body_field(body, 'customer_phone', required=False, default=''),
+            _body_field(body, 'check_in'),
+            _body_field(body, 'check_out')
+        )
+        return 201, {'id': booking_id, 'total_amount': total_amount}
+
+    def _folio(self, booking_id, discount):
+        folio = self.repo().folio(int(booking_id), discount or 0)
+        if folio is None:
+            raise HttpError(404, f"Booking {booking_id} not found")
+        return folio
+
+    def _folio_payload(self, folio):
+        return {
+            'booking_id': folio.booking_id,
+            'room_number': folio.room_number,
+            'customer_name': folio.customer_name,
+            'room_charges': folio.room_charges,
+            'service_charges': folio.service_charges,
+            'subtotal': folio.subtotal,
+            'tax': folio.tax,
+            'discount': folio.discount,
+            'total': folio.total,
+        }
+
+    def get_folio(self, query, body, booking_id):
+        return 200, self._folio_payload(self._folio(booking_id, query.get('discount')))
+
+    def create_bill(self, query, body, booking_id):
+        folio = self._folio(booking_id, body.get('discount'))
+        bill_id = self.repo().bill_folio(folio, _body_field(body, 'payment_method'))
+        return 201, dict(self._folio_payload(folio), id=bill_id)
+
+    def list_services(self, query, body):
+        return 200, self.repo().list_available_services()
+
+    def create_service_request(self, query, body):
+        repo = self.repo()
+        service_id = body.get('service_id')
+        if service_id is None:
+            service_id = repo.get_service_id(_body_field(body, 'service_name'))
+        services = {service.id: service for service in repo.list_available_services()}
+        service = services.get(int(service_id)) if service_id is not None else None
+        if service is None:
+            raise HttpError(404, "Service not found or inactive")
+        quantity = int(body.get('quantity', 1))
+        if quantity < 1:
+            raise HttpError(400, "quantity must be at least 1")
+        booking_id = int(_body_field(body, 'booking_id'))
+        if repo.get_booking(booking_id) is None:
+            raise HttpError(404, f"Booking {booking_id} not found")
+        request_id = repo.create_service_request(
+            booking_id,
+            service.id,
+            quantity,
+            service.price * quantity,
+            body.get('notes', '')
+        )
+        return 201, {'id': request_id, 'total_amount': service.price * quantity}
+
+    def get_stats(self, query, body):
+        return 200, self.stats.snapshot()
+
+    # HTTP
+    def dispatch(self, method, path):
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            return f"{method} {pattern}", handler, match.groups()
+        raise HttpError(405 if allowed else 404, "Method not allowed" if allowed else "Not found")
+
+    def handle(self, method, target, raw_body):
+        # Runs on a pool thread: (status, encoded JSON body, seconds)
+        started = time.perf_counter()
+        route = f"{method} ?"
+        try:
+            url = urlsplit(target)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict):
+                raise HttpError(400, "Request body must be a JSON object")
+            route, handler, args = self.dispatch(method, url.path.rstrip('/') or '/')
+            status, payload = handler(query, body, *args)
+        except HttpError as e:
+            status, payload = e.status, {'error': str(e)}
+        except ConflictError as e:
+            status, payload = 409, {'error': str(e)}
+        except (ValueError, TypeError, ArithmeticError) as e:
+            status, payload = 400, {'error': str(e)}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        data = encode_json(payload)
+        seconds = time.perf_counter() - started
+        self.stats.record(route, status, seconds)
+        return status, data, seconds
+
+    async def serve_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # The body cannot be framed, so the connection cannot be reused
+                    status, data, seconds = 400, encode_json({'error': "Invalid Content-Length"}), 0.0
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, data, seconds = 413, encode_json({'error': "Request body too large"}), 0.0
+                    keep_alive = False
+                else:
+                    raw_body = await reader.readexactly(length) if length else b''
+                    status, data, seconds = await loop.run_in_executor(
+                        self.pool, self.handle, method.upper(), target, raw_body
+                    )
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+
+                writer.write((
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Server-Timing: app;dur={seconds * 1000:.2f}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                ).encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        print(f"Serving {self.config.path} on http://{host}:{port}", file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON API for rooms, bookings, billing and services")
+    parser.add_argument('--db', default=None, help="SQLite database (default: $HMS_DB or hotel.db)")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument('--workers', type=int, default=8, help="Database worker threads (default: 8)")
+    args = parser.parse_args(argv)
+
+    server = ApiServer(DatabaseConfig.from_env(args.db), workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from dates import to_day
+
+
+# Per-room sorted, non-overlapping stay intervals [check_in, check_out) of
+# day numbers (as stored, see dates.py) answering "is this room free" with
+# a binary search
+class RoomSchedule:
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def is_free(self, start, end):
+        # The only interval that can overlap is the last one starting before `end`
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.ends[i - 1] <= start
+
+    def add(self, start, end):
+        # Merge with any intervals it touches so the lists stay sorted and disjoint
+        lo = bisect_left(self.ends, start)
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+            del self.starts[lo:hi]
+            del self.ends[lo:hi]
+        self.starts.insert(lo, start)
+        self.ends.insert(lo, end)
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class AvailabilityIndex:
+    def __init__(self):
+        self.rooms = {}
+        self.since = None
+
+    @classmethod
+    def from_connection(cls, conn, since=None):
+        index = cls()
+        index.load(conn, since)
+        return index
+
+    def load(self, conn, since=None):
+        # Stays that ended before `since` (default today) cannot conflict;
+        # reload_room keeps to the same cut-off
+        self.since = since
+        since = since or date.today()
+        self.rooms = {}
+        for (room_number,) in conn.execute('SELECT room_number FROM rooms'):
+            self.rooms[str(room_number)] = RoomSchedule()
+
+        # A range on idx_bookings_stay (which covers all three columns) reads
+        # only current and future stays; sorting them here (rather than ORDER
+        # BY room_number, which the planner answers by walking every booking
+        # in idx_bookings_room_stay) keeps the appends in order
+        rows = sorted(conn.execute('''
+            SELECT room_number, check_in_date, check_out_date
+            FROM bookings
+            WHERE check_out_date >= ? AND check_in_date IS NOT NULL
+        ''', (to_day(since),)))
+        for room_number, start, end in rows:
+            if start < end:
+                self.add_room(room_number).add(start, end)
+
+    def reload_room(self, conn, room_number):
+        room_number = str(room_number)
+        schedule = self.rooms[room_number] = RoomSchedule()
+        rows = conn.execute('''
+            SELECT check_in_date, check_out_date
+            FROM bookings
+            WHERE room_number = ? AND check_out_date >= ? AND check_in_date IS NOT NULL
+            ORDER BY check_in_date
+        ''', (room_number, to_day(self.since or date.today())))
+        for start, end in rows:
+            if start < end:
+                schedule.add(start, end)
+
+    def add_room(self, room_number):
+        return self.rooms.setdefault(str(room_number), RoomSchedule())
+
+    def remove_room(self, room_number):
+        self.rooms.pop(str(room_number), None)
+
+    def add_booking(self, room_number, check_in, check_out):
+        self.add_room(room_number).add(to_day(check_in), to_day(check_out))
+
+    def is_free(self, room_number, check_in, check_out):
+        schedule = self.rooms.get(str(room_number))
+        return schedule is None or schedule.is_free(to_day(check_in), to_day(check_out))
+
+    def free_rooms(self, check_in, check_out):
+        start, end = to_day(check_in), to_day(check_out)
+        if start >= end:
+            raise ValueError("Check-out date must be after check-in date")
+        return [
+            room_number for room_number, schedule in self.rooms.items()
+            if schedule.is_free(start, end)
+        ]
@@ -0,0 +1,166 @@
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from datagen import FUTURE_DAYS, generate
+from repository import HotelRepository
+
+BASELINE = 'benchmark_baseline.json'
+TOLERANCE = 0.25
+# Generated data ends here by default, so a baseline stays comparable
+# whatever day it is run on
+END = date(2026, 1, 31)
+
+
+def operations(repo, today=None):
+    # The queries behind each screen, by the hms.py method that issues them;
+    # date ranges are relative to today (the generated data's "today" when
+    # benchmarking)
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    year_ago = today - timedelta(days=365)
+    ops = {
+        'load_booking_data': lambda: repo.booking_page(limit=100),
+        'search_bookings': lambda: repo.search_bookings('sharma', limit=100),
+        'load_unbilled_bookings': repo.list_unbilled_bookings,
+        'load_service_bookings': lambda: repo.list_active_bookings(today),
+        'show_weekly_analytics': lambda: repo.booking_summary(week_start, week_start + timedelta(days=6)),
+        'show_monthly_analytics': lambda: repo.booking_summary(month_start, today),
+        'show_booking_trends': lambda: repo.booking_trends(today=today),
+        'show_revenue_analysis': lambda: repo.revenue_by_month(today=today),
+        'show_occupancy_report': lambda: (repo.occupancy_by_period(year_ago, today, 'week'),
+                                          repo.occupancy_by_period(year_ago, today, 'month')),
+        'show_service_history': repo.list_service_history,
+        'search_rooms': lambda: repo.free_rooms(today, today + timedelta(days=3)),
+    }
+    # Paging deep into the list; skipped on a database with no bookings
+    page = repo.booking_page(limit=1000)
+    if page:
+        middle = page[-1]
+        ops['load_booking_data (row 1000)'] = lambda: repo.booking_page(
+            after=(middle.booking_date, middle.id), limit=100)
+    return ops
+
+
+def percentile(samples, fraction):
+    # Nearest-rank percentile of already sorted samples
+    return samples[max(math.ceil(fraction * len(samples)) - 1, 0)]
+
+
+class BenchmarkResult:
+    def __init__(self, name, samples):
+        samples = sorted(samples)
+        self.name = name
+        self.runs = len(samples)
+        self.p50_ms = percentile(samples, 0.50) * 1000
+        self.p99_ms = percentile(samples, 0.99) * 1000
+        self.baseline = None
+
+    @property
+    def change(self):
+        # p50 relative to the baseline (0.10 = 10% slower)
+        if not self.baseline or not self.baseline['p50_ms']:
+            return None
+        return self.p50_ms / self.baseline['p50_ms'] - 1
+
+    def regressed(self, tolerance):
+        return self.change is not None and self.change > tolerance
+
+    def __str__(self):
+        line = f"{self.name:<30} p50 {self.p50_ms:9.2f} ms   p99 {self.p99_ms:9.2f} ms"
+        if self.change is not None:
+            line += f"   {self.change:+7.1%} vs baseline"
+        return line
+
+
+def run_benchmarks(repo, runs=20, only=None, today=None):
+    results = []
+    for name, operation in operations(repo, today).items():
+        if only and name not in only:
+            continue
+        operation()  # warm the page cache and statement cache
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            operation()
+            samples.append(time.perf_counter() - started)
+        results.append(BenchmarkResult(name, samples))
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(path, dataset, results):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'dataset': dataset,
+            'recorded': datetime.now().isoformat(timespec='seconds'),
+            'results': {r.name: {'p50_ms': r.p50_ms, 'p99_ms': r.p99_ms} for r in results},
+        }, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the queries behind each screen on a synthetic hotel")
+    parser.add_argument('--rooms', type=int, default=100, help="Rooms in the synthetic hotel (default: 100)")
+    parser.add_argument('--years', type=int, default=2, help="Years of booking history (default: 2)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the generated data")
+    parser.add_argument('--end', type=date.fromisoformat, default=END,
+                        help=f"Last generated date, YYYY-MM-DD (default: {END})")
+    parser.add_argument('--runs', type=int, default=20, help="Timed runs per query (default: 20)")
+    parser.add_argument('--only', action='append', help="Run only this query (repeatable)")
+    parser.add_argument('--keep-db', help="Generate into this file and keep it (reused if it exists)")
+    parser.add_argument('--baseline', default=BASELINE, help=f"Baseline file (default: {BASELINE})")
+    parser.add_argument('--save-baseline', action='store_true', help="Record these results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Allowed p50 slowdown before a query counts as a regression (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    dataset = {'rooms': args.rooms, 'years': args.years, 'seed': args.seed, 'end': args.end.isoformat()}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.keep_db or os.path.join(tmp, 'benchmark.db')
+        existing = os.path.exists(path)
+        repo = HotelRepository.open(path)
+        try:
+            if not existing:
+                print(generate(repo.conn, args.rooms, args.years, args.seed, end=args.end), file=sys.stderr)
+            # Every date-relative query, the availability index included, is
+            # anchored at the generated data's "today"
+            today = args.end - timedelta(days=FUTURE_DAYS)
+            repo.refresh_availability(since=today)
+            results = run_benchmarks(repo, args.runs, args.only, today)
+        finally:
+            repo.close()
+
+    baseline = load_baseline(args.baseline)
+    if baseline and baseline.get('dataset') != dataset:
+        print(f"Baseline was recorded on {baseline.get('dataset')}; not comparing", file=sys.stderr)
+        baseline = None
+    for result in results:
+        if baseline:
+            result.baseline = baseline['results'].get(result.name)
+        print(result)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, dataset, results)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = [r for r in results if r.regressed(args.tolerance)]
+    for result in regressions:
+        print(f"REGRESSION: {result.name} p50 {result.change:+.1%} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import argparse
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# Tables whose writes are recorded in change_log by triggers (migration 16)
+TRACKED_TABLES = ('rooms', 'bookings', 'bills', 'services', 'service_requests',
+                  'staff', 'salary_payments')
+
+
+# Reads the trigger-maintained change_log. Every insert, update and delete on
+# a tracked table appends (version, table, row id, op); clients remember the
+# last version they saw and fetch only what came after it, which is a range
+# scan on the primary key.
+class ChangeFeed:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def latest_version(self):
+        return self.conn.execute('SELECT COALESCE(MAX(version), 0) FROM change_log').fetchone()[0]
+
+    def since(self, version, limit=5000):
+        # (new version, {table: {row id: last op}}); when more than `limit`
+        # changes are pending the rest come with the next call
+        rows = self.conn.execute('''
+            SELECT version, table_name, row_id, op
+            FROM change_log
+            WHERE version > ?
+            ORDER BY version
+            LIMIT ?
+        ''', (version, limit)).fetchall()
+        changes = {}
+        for version, table_name, row_id, op in rows:
+            changes.setdefault(table_name, {})[row_id] = op
+        return version, changes
+
+    def prune(self, before):
+        # Drop entries recorded before `before` (a datetime); returns the count
+        with self.conn:
+            cursor = self.conn.execute(
+                'DELETE FROM change_log WHERE changed_at < ?',
+                (before.strftime('%Y-%m-%d %H:%M:%S'),)
+            )
+        return cursor.rowcount
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prune the change log used for cross-terminal refresh")
+    parser.add_argument('--db', default='hotel.db', help="SQLite database (default: hotel.db)")
+    parser.add_argument('--keep-days', type=int, default=7, help="Keep this many days of changes")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    # changed_at is recorded in UTC (CURRENT_TIMESTAMP)
+    removed = ChangeFeed(conn).prune(datetime.now(timezone.utc) - timedelta(days=args.keep_days))
+    print(f"Removed {removed} change log entries")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from querylog import SLOW_LOG, InstrumentedConnection, shared_log
+
+
+# Connection settings, overridable per terminal through HMS_* environment variables
+class DatabaseConfig:
+    def __init__(self, path='hotel.db', journal_mode='WAL', synchronous='NORMAL',
+                 busy_timeout_ms=5000, cache_size_kb=65536, mmap_size=256 * 1024 * 1024,
+                 split_readers=True, slow_query_ms=None, query_log=SLOW_LOG, explain_slow=False):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.split_readers = split_readers
+        # Statement timing (see querylog.py) is on when slow_query_ms is set
+        self.slow_query_ms = slow_query_ms
+        self.query_log = query_log
+        self.explain_slow = explain_slow
+
+    @classmethod
+    def from_env(cls, path=None):
+        env = os.environ
+        defaults = cls()
+        return cls(
+            path=path or env.get('HMS_DB', defaults.path),
+            journal_mode=env.get('HMS_JOURNAL_MODE', defaults.journal_mode),
+            synchronous=env.get('HMS_SYNCHRONOUS', defaults.synchronous),
+            busy_timeout_ms=int(env.get('HMS_BUSY_TIMEOUT_MS', defaults.busy_timeout_ms)),
+            cache_size_kb=int(env.get('HMS_CACHE_SIZE_KB', defaults.cache_size_kb)),
+            mmap_size=int(env.get('HMS_MMAP_SIZE', defaults.mmap_size)),
+            split_readers=env.get('HMS_SPLIT_READERS', '1') != '0',
+            slow_query_ms=float(env['HMS_SLOW_QUERY_MS']) if env.get('HMS_SLOW_QUERY_MS') else None,
+            query_log=env.get('HMS_QUERY_LOG', defaults.query_log),
+            explain_slow=env.get('HMS_EXPLAIN_SLOW', '0') != '0'
+        )
+
+    @property
+    def in_memory(self):
+        return self.path == ':memory:' or str(self.path).startswith('file::memory:')
+
+
+# Hands out one writer and one read-only connection per thread. In WAL mode
+# readers never block the writer (or each other), so other terminals and
+# report queries keep reading while a booking is being written.
+class ConnectionManager:
+    def __init__(self, config=None):
+        self.config = config or DatabaseConfig()
+        self._local = threading.local()
+
+    def _connect(self, database, **kwargs):
+        config = self.config
+        if config.slow_query_ms is None:
+            return sqlite3.connect(database, timeout=config.busy_timeout_ms / 1000, **kwargs)
+        conn = sqlite3.connect(database, timeout=config.busy_timeout_ms / 1000,
+                               factory=InstrumentedConnection, **kwargs)
+        conn.query_log = shared_log(config.slow_query_ms, config.query_log, config.explain_slow)
+        return conn
+
+    def _configure(self, conn):
+        config = self.config
+        conn.execute(f'PRAGMA busy_timeout = {int(config.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA cache_size = {-int(config.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size = {int(config.mmap_size)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+
+    def writer(self):
+        conn = getattr(self._local, 'writer', None)
+        if conn is None:
+            config = self.config
+            conn = self._connect(config.path)
+            if not config.in_memory:
+                conn.execute(f'PRAGMA journal_mode = {config.journal_mode}')
+            conn.execute(f'PRAGMA synchronous = {config.synchronous}')
+            self._configure(conn)
+            self._local.writer = conn
+        return conn
+
+    def reader(self):
+        conn = getattr(self._local, 'reader', None)
+        if conn is None:
+            config = self.config
+            if config.in_memory or not config.split_readers:
+                # A private in-memory database is only visible to its own connection
+                return self.writer()
+            uri = Path(config.path).absolute().as_uri() + '?mode=ro'
+            conn = self._connect(uri, uri=True)
+            self._configure(conn)
+            conn.execute('PRAGMA query_only = ON')
+            self._local.reader = conn
+        return conn
+
+    def close(self):
+        # Closes the calling thread's connections
+        for name in ('reader', 'writer'):
+            conn = getattr(self._local, name, None)
+            if conn is not None:
+                conn.close()
+                setattr(self._local, name, None)
@@ -0,0 +1,385 @@
+import argparse
+import bisect
+import math
+import random
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from analytics import AnalyticsRollup
+from changes import TRACKED_TABLES
+from dates import to_day, to_epoch
+from repository import init_schema
+
+BATCH_SIZE = 50000
+# Days of future reservations after "today"
+FUTURE_DAYS = 30
+
+ROOM_MIX = [('SINGLE', 0.30), ('DOUBLE', 0.40), ('DELUXE', 0.20), ('SUITE', 0.10)]
+RATES = {'SINGLE': (6000, 9000), 'DOUBLE': (9000, 14000), 'DELUXE': (16000, 24000), 'SUITE': (30000, 45000)}
+# Relative frequency of 1..14 night stays; suites skew longer
+STAY_WEIGHTS = {
+    'SINGLE': [34, 24, 14, 9, 6, 4, 4, 1, 1, 1, 1, 0.5, 0.5, 1],
+    'DOUBLE': [26, 25, 17, 10, 7, 5, 5, 1, 1, 1, 1, 0.5, 0.5, 1],
+    'DELUXE': [20, 24, 18, 12, 8, 6, 6, 1, 1, 1, 1, 0.5, 0.5, 1.5],
+    'SUITE': [12, 18, 18, 14, 10, 8, 9, 2, 2, 2, 1, 1, 1, 2],
+}
+# Average occupancy by month, plus a bump for Friday and Saturday arrivals
+SEASON = [0.55, 0.58, 0.64, 0.70, 0.74, 0.82, 0.90, 0.88, 0.72, 0.66, 0.60, 0.75]
+WEEKEND_BOOST = 0.08
+CANCELLATION_RATE = 0.08
+LEAD_DAYS = 21  # mean days between booking and arrival
+SERVICES_PER_NIGHT = 0.45
+SERVICE_WEIGHTS = {'Cleaning': 3.0, 'Food': 2.0, 'Laundry': 1.5, 'Other': 0.5}
+PAYMENT_METHODS = [('Card', 0.55), ('Cash', 0.25), ('UPI', 0.20)]
+POSITIONS = [('Housekeeping', 0.35, 1800000), ('Receptionist', 0.20, 2500000), ('Chef', 0.15, 3500000),
+             ('Maintenance', 0.10, 2200000), ('Security', 0.10, 2000000), ('Manager', 0.10, 6000000)]
+FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Neha', 'Arjun', 'Kavya', 'Rohan', 'Isha',
+               'John', 'Maria', 'Wei', 'Fatima', 'Lucas', 'Sofia', 'Omar', 'Yuki', 'Elena', 'David']
+LAST_NAMES = ['Singh', 'Sharma', 'Patel', 'Gupta', 'Reddy', 'Iyer', 'Nair', 'Das', 'Mehta', 'Joshi',
+              'Smith', 'Garcia', 'Chen', 'Khan', 'Silva', 'Müller', 'Rossi', 'Tanaka', 'Novak', 'Cohen']
+
+
+class GenerateStats:
+    def __init__(self):
+        self.rooms = 0
+        self.bookings = 0
+        self.cancelled = 0
+        self.bills = 0
+        self.service_requests = 0
+        self.staff = 0
+        self.salary_payments = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows(self):
+        return (self.rooms + self.bookings + self.bills + self.service_requests
+                + self.staff + self.salary_payments)
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.rooms} rooms, {self.bookings} bookings ({self.cancelled} cancelled, not stored), "
+            f"{self.bills} bills, {self.service_requests} service requests, {self.staff} staff, "
+            f"{self.salary_payments} salary payments in {self.elapsed:.1f}s ({self.rows_per_sec:,.0f} rows/sec)"
+        )
+
+
+class _Chooser:
+    # Weighted choice by bisecting precomputed cumulative weights, which is
+    # much cheaper than random.choices() when called millions of times
+    def __init__(self, rng, items, weights):
+        self.random = rng.random
+        self.items = list(items)
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def __call__(self):
+        return self.items[bisect.bisect(self.cumulative, self.random() * self.total)]
+
+
+@contextmanager
+def _triggers_suspended(conn):
+    # The search-index and change-log triggers cost more than the inserts
+    # themselves. A new database has no terminals to notify, so load without
+    # them, then put them back and rebuild the search index in one pass.
+    names = [f'{table}_change_{op}' for table in TRACKED_TABLES for op in ('insert', 'update', 'delete')]
+    names += ['bookings_fts_insert', 'bookings_fts_delete', 'bookings_fts_update']
+    triggers = conn.execute(f'''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND name IN ({', '.join('?' * len(names))})
+    ''', names).fetchall()
+    with conn:
+        for name, _ in triggers:
+            conn.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        with conn:
+            for _, sql in triggers:
+                conn.execute(sql)
+            conn.execute("INSERT INTO bookings_fts (bookings_fts) VALUES ('rebuild')")
+
+
+# Seeded generator for a realistic hotel. Same seed and arguments, same rows.
+#  - occupancy follows SEASON per month with busier weekends
+#  - stay length per room type from STAY_WEIGHTS, lead time exponential
+#  - CANCELLATION_RATE of reservations are cancelled; the schema has no
+#    cancelled state, so their nights are released and nothing is stored
+#  - service requests per stay ~ Poisson(SERVICES_PER_NIGHT * nights)
+#  - past stays are billed (a few left open), with occasional discounts
+#  - staff hired and leaving over the period, paid monthly with yearly raises
+class HotelGenerator:
+    def __init__(self, conn, rooms=100, years=2, seed=1, end=None, batch_size=BATCH_SIZE):
+        self.conn = conn
+        self.rooms = rooms
+        self.years = years
+        self.rng = random.Random(seed)
+        # History up to "today" plus a month of future reservations. end
+        # anchors the whole data set (today is derived from it), so a fixed
+        # end and seed always give the same rows; the default follows the
+        # calendar
+        self.end = end or date.today() + timedelta(days=FUTURE_DAYS)
+        self.today = self.end - timedelta(days=FUTURE_DAYS)
+        self.start = self.end - timedelta(days=365 * years + 30)
+        self.batch_size = batch_size
+        self.stats = GenerateStats()
+
+        rng = self.rng
+        self.stay_length = {
+            room_type: _Chooser(rng, range(1, len(weights) + 1), weights)
+            for room_type, weights in STAY_WEIGHTS.items()
+        }
+        self.payment_method = _Chooser(rng, *zip(*PAYMENT_METHODS))
+        services = conn.execute('SELECT id, price, category FROM services WHERE is_active = 1').fetchall()
+        self.services = {service_id: price for service_id, price, _ in services}
+        self.service = _Chooser(rng, [s[0] for s in services],
+                                [SERVICE_WEIGHTS.get(s[2], 1.0) for s in services])
+
+        # Chance that a stay starts on a free night, so that stays of the
+        # average length fill the season's share of nights
+        mean_stay = sum(n * w for n, w in enumerate(STAY_WEIGHTS['DOUBLE'], 1)) / sum(STAY_WEIGHTS['DOUBLE'])
+        self.arrival = []
+        for offset in range((self.end - self.start).days + 1):
+            day = self.start + timedelta(days=offset)
+            occupancy = SEASON[day.month - 1] + (WEEKEND_BOOST if day.weekday() >= 4 else 0)
+            occupancy = min(occupancy, 0.97) / (1 - CANCELLATION_RATE * (1 - min(occupancy, 0.97)))
+            self.arrival.append(min(occupancy / (mean_stay * (1 - occupancy) + occupancy), 1.0))
+
+    def _name(self):
+        rng = self.rng
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    def _phone(self):
+        return f'9{self.rng.randrange(100000000, 999999999)}'
+
+    def generate(self, progress=None):
+        if self.conn.execute('SELECT COUNT(*) FROM rooms').fetchone()[0]:
+            raise ValueError("Database already has rooms; generate into a new database")
+
+        with _triggers_suspended(self.conn):
+            room_list = self.generate_rooms()
+            self.generate_stays(room_list, progress)
+            self.generate_payroll()
+
+        # Rollups and planner statistics over the new rows
+        with self.conn:
+            AnalyticsRollup(self.conn).rebuild()
+        self.conn.execute('ANALYZE')
+        self.stats.elapsed = time.perf_counter() - self.stats.started
+        return self.stats
+
+    def generate_rooms(self):
+        rng = self.rng
+        room_type = _Chooser(rng, *zip(*ROOM_MIX))
+        floors = max(math.ceil(self.rooms / 40), 1)
+        per_floor = math.ceil(self.rooms / floors)
+        room_list = []
+        for index in range(self.rooms):
+            floor, number = divmod(index, per_floor)
+            kind = room_type()
+            low, high = RATES[kind]
+            room_list.append((f'{floor + 1}{number + 1:02d}', kind, rng.randrange(low, high + 1, 500), 1,
+                              f'{kind.title()} room, floor {floor + 1}'))
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO rooms (room_number, room_type, rate, is_available, description, last_updated)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', room_list)
+        self.stats.rooms = len(room_list)
+        return room_list
+
+    def generate_stays(self, room_list, progress=None):
+        rng = self.rng
+        random_ = rng.random
+        randrange = rng.randrange
+        expovariate = rng.expovariate
+        arrival = self.arrival
+        today = self.today
+        start = self.start
+        days = len(arrival) - 1
+        stats = self.stats
+        booking_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM bookings').fetchone()[0]
+        bookings, bills, requests = [], [], []
+
+        for room_number, room_type, rate, _, _ in room_list:
+            stay_length = self.stay_length[room_type]
+            offset = 0
+            while offset < days:
+                if random_() >= arrival[offset]:
+                    offset += 1
+                    continue
+                nights = min(stay_length(), days - offset)
+                if random_() < CANCELLATION_RATE:
+                    # Cancelled: the nights stay free for the next guest
+                    stats.cancelled += 1
+                    offset += 1
+                    continue
+
+                check_in = start + timedelta(days=offset)
+                check_out = check_in + timedelta(days=nights)
+                booked = datetime(check_in.year, check_in.month, check_in.day) - timedelta(
+                    days=min(int(expovariate(1 / LEAD_DAYS)), 365), seconds=randrange(86400))
+                if booked.date() > today:
+                    # Not booked yet as of today: spread over today, so the
+                    # newest rows do not all share one booking_date
+                    booked = datetime(today.year, today.month, today.day) + timedelta(
+                        seconds=randrange(86400))
+                booking_id += 1
+                amount = rate * nights
+                bookings.append((booking_id, room_number, self._name(), self._phone(),
+                                 to_day(check_in), to_day(check_out), amount, to_epoch(booked)))
+
+                # Service requests during the stay
+                service_total = 0
+                status = 'Completed' if check_out <= today else 'Pending'
+                count, threshold, product = 0, math.exp(-SERVICES_PER_NIGHT * nights), random_()
+                while product > threshold:
+                    count += 1
+                    product *= random_()
+                for _ in range(count):
+                    service_id = self.service()
+                    quantity = 1 if random_() < 0.8 else randrange(2, 4)
+                    total = self.services[service_id] * quantity
+                    service_total += total
+                    requested = datetime(check_in.year, check_in.month, check_in.day, 8) + timedelta(
+                        seconds=randrange(nights * 86400 - 8 * 3600))
+                    requests.append((booking_id, service_id, quantity, total, str(requested), status, ''))
+
+                # Past stays are billed at check-out; a few are left open
+                if check_out <= today and random_() < 0.97:
+                    subtotal = amount + service_total
+                    tax = (subtotal + 5) // 10
+                    discount = (subtotal // 20) if random_() < 0.05 else 0
+                    bills.append((booking_id, subtotal, tax, discount, subtotal + tax - discount, 'Paid',
+                                  self.payment_method(), f'{check_out.isoformat()} {randrange(7, 12):02d}:'
+                                  f'{randrange(60):02d}:{randrange(60):02d}'))
+
+                offset += nights
+                if len(bookings) >= self.batch_size:
+                    self._write_stays(bookings, bills, requests)
+                    bookings, bills, requests = [], [], []
+                    if progress:
+                        stats.elapsed = time.perf_counter() - stats.started
+                        progress(stats)
+
+        self._write_stays(bookings, bills, requests)
+
+    def _write_stays(self, bookings, bills, requests):
+        # One transaction per batch
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO bookings (id, room_number, customer_name, customer_phone, check_in_date,
+                                      check_out_date, total_amount, booking_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', bookings)
+            self.conn.executemany('''
+                INSERT INTO bills (booking_id, subtotal, tax_amount, discount_amount, total_amount,
+                                   payment_status, payment_method, bill_date)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', bills)
+            self.conn.executemany('''
+                INSERT INTO service_requests (booking_id, service_id, quantity, total_amount,
+                                              request_date, status, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', requests)
+        self.stats.bookings += len(bookings)
+        self.stats.bills += len(bills)
+        self.stats.service_requests += len(requests)
+
+    def generate_payroll(self):
+        rng = self.rng
+        position = _Chooser(rng, [(p[0], p[2]) for p in POSITIONS], [p[1] for p in POSITIONS])
+        headcount = max(self.rooms // 4, 5)
+        staff, payments = [], []
+        number = 0
+        # Current headcount plus the people they replaced along the way
+        for seat in range(headcount):
+            joined = self.start - timedelta(days=rng.randrange(0, 3 * 365))
+            while joined <= self.today:
+                number += 1
+                employee_id = f'EMP{number:05d}'
+                title, salary = position()
+                salary = salary * rng.randrange(90, 131) // 100 // 100 * 100
+                tenure = int(rng.expovariate(1 / (4 * 365)))
+                left = joined + timedelta(days=tenure)
+                active = left > self.today
+                staff.append((employee_id, self._name(), title, self._phone(),
+                              f'{employee_id.lower()}@hotel.example', f'{rng.randrange(1, 300)} Main Road',
+                              joined.isoformat(), salary, 'Active' if active else 'Inactive'))
+
+                # Paid on the last working day of each month worked in the period
+                month = date(max(joined, self.start).year, max(joined, self.start).month, 1)
+                last_month = min(left, self.today)
+                while month <= last_month:
+                    following = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+                    paid = following - timedelta(days=1)
+                    if paid > last_month:
+                        break
+                    if month.month == joined.month and month.year > joined.year:
+                        salary = salary * rng.randrange(103, 109) // 100 // 100 * 100
+                    bonus = salary // 2 if month.month == 12 else 0
+                    deductions = salary // 10
+                    payments.append((employee_id, paid.isoformat(), salary, bonus, deductions,
+                                     salary + bonus - deductions, 'Bank Transfer',
+                                     'Annual bonus' if bonus else ''))
+                    month = following
+                joined = left + timedelta(days=rng.randrange(7, 60))
+
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO staff (employee_id, name, position, phone, email, address, join_date,
+                                   base_salary, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', staff)
+            self.conn.executemany('''
+                INSERT INTO salary_payments (employee_id, payment_date, base_salary, bonus, deductions,
+                                             net_salary, payment_method, remarks)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', payments)
+        self.stats.staff = len(staff)
+        self.stats.salary_payments = len(payments)
+
+
+def generate(conn, rooms=100, years=2, seed=1, batch_size=BATCH_SIZE, progress=None, end=None):
+    return HotelGenerator(conn, rooms, years, seed, end, batch_size).generate(progress)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a realistic synthetic hotel into a new database")
+    parser.add_argument('db', help="SQLite database to create (must not have rooms yet)")
+    parser.add_argument('--rooms', type=int, default=200, help="Number of rooms (default: 200)")
+    parser.add_argument('--years', type=int, default=3, help="Years of history (default: 3)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed; same seed, same data")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Bookings per transaction")
+    parser.add_argument('--end', type=date.fromisoformat,
+                        help=f"Last generated date, YYYY-MM-DD (default: {FUTURE_DAYS} days from today)")
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    # A throwaway bulk load: skip the per-commit fsync
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')
+    try:
+        init_schema(conn)
+        stats = generate(conn, args.rooms, args.years, args.seed, args.batch_size,
+                         progress=lambda s: print(s, file=sys.stderr), end=args.end)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+    print(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+# Stay dates are stored as integer day numbers (days since 1970-01-01) and
+# booking times as integer seconds since 1970-01-01 00:00 on the hotel's
+# clock (local time, no time zone, like the timestamps they replace). A stay
+# is the half-open range [check_in, check_out) and every date-range filter
+# compares plain integers, so each one is a single index range scan;
+# booking_date // 86400 is the day number of the day it was made.
+DAY_SECONDS = 86400
+EPOCH = date(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+EPOCH_DATETIME = datetime(1970, 1, 1)
+
+
+def to_day(value):
+    # Storage form of a date, datetime or 'YYYY-MM-DD' string: day number
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        try:
+            value = date.fromisoformat(str(value)[:10])
+        except ValueError:
+            raise ValueError("Invalid date format. Please use YYYY-MM-DD")
+    return value.toordinal() - EPOCH_ORDINAL
+
+
+def from_day(day):
+    # Stored day number back to a date; NULL stays None
+    if day is None:
+        return None
+    return date.fromordinal(EPOCH_ORDINAL + int(day))
+
+
+def to_epoch(value):
+    # Storage form of a datetime, date or ISO string: whole seconds
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    elif not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - EPOCH_DATETIME) // timedelta(seconds=1)
+
+
+def from_epoch(seconds):
+    # Stored seconds back to a datetime; NULL stays None
+    if seconds is None:
+        return None
+    return EPOCH_DATETIME + timedelta(seconds=int(seconds))
@@ -0,0 +1,104 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+
+# Runs database work on a dedicated thread that owns its own repository
+# (SQLite connections are bound to the thread that created them) and hands
+# results back to the Tk main loop via root.after, so long queries never
+# block the UI.
+class DatabaseWorker:
+    POLL_MS = 20
+
+    def __init__(self, root, repo_factory, on_busy=None):
+        self.root = root
+        self.on_busy = on_busy
+        self.pending = 0
+        self.busy = 0
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._polling = False
+        self._thread = threading.Thread(
+            target=self._work, args=(repo_factory,), name="db-worker", daemon=True
+        )
+        self._thread.start()
+
+    def _work(self, repo_factory):
+        try:
+            repo = repo_factory()
+        except BaseException as e:
+            # The database could not be opened: every job fails with why
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                job[0].set_exception(e)
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                future, fn, args = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(repo, *args))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            repo.close()
+
+    def submit(self, fn, *args):
+        # fn(repo, *args) runs on the worker thread; returns a Future
+        future = Future()
+        self._jobs.put((future, fn, args))
+        return future
+
+    def run(self, fn, *args, on_success=None, on_error=None, busy=True):
+        # Like submit(), but calls on_success(result) / on_error(exception)
+        # on the Tk main thread once fn finishes. busy=False keeps routine
+        # background jobs (change polling) off the busy indicator.
+        future = self.submit(fn, *args)
+        future.add_done_callback(lambda f: self._results.put((f, on_success, on_error, busy)))
+        self.pending += 1
+        if busy:
+            self._set_busy(self.busy + 1)
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return future
+
+    def _poll(self):
+        while True:
+            try:
+                future, on_success, on_error, busy = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if busy:
+                self._set_busy(self.busy - 1)
+            error = future.exception()
+            try:
+                if error is not None:
+                    if on_error is not None:
+                        on_error(error)
+                    else:
+                        self.root.report_callback_exception(type(error), error, error.__traceback__)
+                elif on_success is not None:
+                    on_success(future.result())
+            except Exception as e:
+                self.root.report_callback_exception(type(e), e, e.__traceback__)
+
+        if self.pending:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _set_busy(self, busy):
+        self.busy = busy
+        if self.on_busy is not None:
+            self.on_busy(busy > 0)
+
+    def close(self, timeout=5):
+        self._jobs.put(None)
+        self._thread.join(timeout)
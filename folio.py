@@ -0,0 +1,42 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from money import CENT, to_decimal
+
+TAX_RATE = Decimal("0.10")  # 10% tax
+
+
+# Everything charged to one booking: room charges plus service requests,
+# with tax and discount computed in Decimal so totals match to the cent
+class Folio:
+    def __init__(self, booking_id, room_number, customer_name, room_charges,
+                 service_charges, service_count=0, discount=0, tax_rate=TAX_RATE):
+        self.booking_id = booking_id
+        self.room_number = room_number
+        self.customer_name = customer_name
+        self.room_charges = to_decimal(room_charges)
+        self.service_charges = to_decimal(service_charges)
+        self.service_count = service_count
+        self.tax_rate = Decimal(str(tax_rate))
+        self.discount = to_decimal(discount)
+        if self.discount < 0 or self.discount > self.subtotal + self.tax:
+            raise ValueError("Invalid discount amount")
+
+    @property
+    def subtotal(self):
+        return self.room_charges + self.service_charges
+
+    @property
+    def tax(self):
+        return (self.subtotal * self.tax_rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    @property
+    def total(self):
+        return self.subtotal + self.tax - self.discount
+
+    def with_discount(self, discount):
+        return Folio(self.booking_id, self.room_number, self.customer_name,
+                     self.room_charges, self.service_charges, self.service_count,
+                     discount, self.tax_rate)
+
+    def __repr__(self):
+        return f"Folio(booking {self.booking_id}: subtotal {self.subtotal}, tax {self.tax}, total {self.total})"
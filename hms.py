@@ -1,31 +1,44 @@
+import time
+STARTED = time.perf_counter()  # start of the time-to-first-frame measurement
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import sqlite3
 from datetime import datetime, timedelta
-import qrcode
-from PIL import Image, ImageTk
+from functools import lru_cache
+import base64
+import io
 import os
+import sys
+from repository import HotelRepository
+from widgets import PagedTreeview, ScreenManager, TableBinding
+from db_worker import DatabaseWorker
+from money import to_decimal
+from records import Room
 
 # Constants for billing
-TAX_RATE = 0.10  # 10% tax
-QR_CODE_PATH = "payment_qr.png"  # Path to save QR code image
+QR_CODE_SIZE = (200, 200)  # Displayed QR code size in pixels
+DB_PATH = os.environ.get("HMS_DB", "hotel.db")
+CHANGE_POLL_MS = 1000  # How often to check for writes from other terminals
 
-# Room Class
-class Room:
-    ROOM_TYPES = [
-        ('SINGLE', 'Single Room'),
-        ('DOUBLE', 'Double Room'), 
-        ('DELUXE', 'Deluxe Room'),
-        ('SUITE', 'Suite')
-    ]
-    
-    def __init__(self, room_number, room_type, rate, is_available=True, description=""):
-        self.room_number = room_number
-        self.room_type = room_type
-        self.rate = rate
-        self.is_available = is_available
-        self.description = description
-        self.last_updated = datetime.now()
+
+# Payment QR codes rendered to PNG in memory, cached by payload so
+# reprinting a bill skips the encode entirely
+@lru_cache(maxsize=128)
+def render_qr_png(payload):
+    # qrcode (and PIL behind it) take longer to import than the whole
+    # window takes to draw, so they are loaded with the first bill
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    qr_image = qr.make_image(fill_color="black", back_color="white")
+    qr_image = qr_image.resize(QR_CODE_SIZE)
+
+    buffer = io.BytesIO()
+    qr_image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue())
 
 # Main Application Class
 class HotelManagementSystem:
@@ -35,154 +48,99 @@ class HotelManagementSystem:
         self.root.geometry("1200x700")
         self.root.configure(bg="#f0f0f0")
         
-        # Initialize Database
-        self.init_database()
-        
         # Create Main UI Components
         self.create_header()
+        
+        # All queries run on a worker thread with its own connection (which
+        # also brings the schema up to date), so a lock held at another
+        # terminal never stalls the window
+        self.db = DatabaseWorker(self.root, lambda: HotelRepository.open(DB_PATH), on_busy=self.set_busy)
         self.create_sidebar()
         self.create_main_content()
         
-    def init_database(self):
-        self.conn = sqlite3.connect('hotel.db')
-        self.cursor = self.conn.cursor()
-        
-        # Create rooms table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rooms (
-                id INTEGER PRIMARY KEY,
-                room_number TEXT UNIQUE,
-                room_type TEXT,
-                rate REAL,
-                is_available INTEGER,
-                description TEXT,
-                last_updated TIMESTAMP
-            )
-        ''')
-        
-        # Create bookings table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bookings (
-                id INTEGER PRIMARY KEY,
-                room_number TEXT,
-                customer_name TEXT,
-                customer_phone TEXT,
-                check_in_date TEXT,
-                check_out_date TEXT,
-                total_amount REAL,
-                booking_date TIMESTAMP,
-                FOREIGN KEY (room_number) REFERENCES rooms (room_number)
-            )
-        ''')
-
-        # Create bills table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS bills (
-                id INTEGER PRIMARY KEY,
-                booking_id INTEGER,
-                subtotal REAL,
-                tax_amount REAL,
-                discount_amount REAL,
-                total_amount REAL,
-                payment_status TEXT,
-                payment_method TEXT,
-                bill_date TIMESTAMP,
-                FOREIGN KEY (booking_id) REFERENCES bookings (id)
-            )
-        ''')
-
-        # Create services table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS services (
-                id INTEGER PRIMARY KEY,
-                service_name TEXT,
-                description TEXT,
-                price REAL,
-                category TEXT,
-                is_active INTEGER
-            )
-        ''')
-
-        # Create service_requests table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS service_requests (
-                id INTEGER PRIMARY KEY,
-                booking_id INTEGER,
-                service_id INTEGER,
-                quantity INTEGER,
-                total_amount REAL,
-                request_date TIMESTAMP,
-                status TEXT,
-                notes TEXT,
-                FOREIGN KEY (booking_id) REFERENCES bookings (id),
-                FOREIGN KEY (service_id) REFERENCES services (id)
-            )
-        ''')
-
-        # Create analytics table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analytics (
-                id INTEGER PRIMARY KEY,
-                date TEXT,
-                total_bookings INTEGER,
-                total_revenue REAL,
-                average_booking_value REAL,
-                occupancy_rate REAL,
-                room_type_distribution TEXT,
-                payment_method_distribution TEXT
-            )
-        ''')
-
-        # Create staff table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS staff (
-                id INTEGER PRIMARY KEY,
-                employee_id TEXT UNIQUE,
-                name TEXT,
-                position TEXT,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                join_date TEXT,
-                base_salary REAL,
-                status TEXT
-            )
-        ''')
-
-        # Create salary_payments table if not exists
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS salary_payments (
-                id INTEGER PRIMARY KEY,
-                employee_id TEXT,
-                payment_date TEXT,
-                base_salary REAL,
-                bonus REAL,
-                deductions REAL,
-                net_salary REAL,
-                payment_method TEXT,
-                remarks TEXT,
-                FOREIGN KEY (employee_id) REFERENCES staff (employee_id)
-            )
-        ''')
-
-        # Insert default services if not exists
-        self.cursor.execute('SELECT COUNT(*) FROM services')
-        if self.cursor.fetchone()[0] == 0:
-            default_services = [
-                ('Room Service', 'Daily room cleaning and maintenance', 25.00, 'Cleaning', 1),
-                ('Laundry Service', 'Wash, dry, and fold service', 15.00, 'Laundry', 1),
-                ('Mini Bar Refill', 'Refill of room mini bar items', 50.00, 'Food', 1),
-                ('Food Delivery', 'Delivery of food and snacks to room', 10.00, 'Food', 1),
-                ('Extra Towels', 'Additional towels and linens', 5.00, 'Cleaning', 1),
-                ('Late Checkout', 'Extended stay beyond standard checkout time', 30.00, 'Other', 1)
-            ]
-            self.cursor.executemany('''
-                INSERT INTO services (service_name, description, price, category, is_active)
-                VALUES (?, ?, ?, ?, ?)
-            ''', default_services)
-            self.conn.commit()
-
-        self.conn.commit()
+        # Pick up bookings and edits made at other terminals
+        self.room_filter = None
+        self.change_version = None
+        self.poll_changes()
+        
+        # Idle callbacks run after the pending redraws, i.e. once the
+        # window is on screen
+        self.startup_ms = None
+        self.root.after_idle(self.first_frame)
+        
+    def first_frame(self):
+        self.startup_ms = (time.perf_counter() - STARTED) * 1000
+        if "--startup-time" in sys.argv:
+            # python hms.py --startup-time: report and exit, for timing restarts
+            print(f"First frame after {self.startup_ms:.0f} ms", file=sys.stderr)
+            self.root.quit()
+        
+    def poll_changes(self):
+        # Only the change-log entries past the last version seen are read, on
+        # the worker (whose availability index they keep current); lists on
+        # screen are reloaded only when a table they show changed
+        def done(result):
+            try:
+                self.change_version, changes = result
+                if changes:
+                    self.refresh_changed(changes)
+            finally:
+                self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        
+        def failed(error):
+            self.root.after(CHANGE_POLL_MS, self.poll_changes)
+            if not isinstance(error, sqlite3.Error):
+                self.root.report_callback_exception(type(error), error, error.__traceback__)
+            # Database busy or locked; try again on the next tick
+        
+        def check(repo):
+            # The first tick only records where the change log stands
+            if version is None:
+                return repo.change_version(), []
+            return repo.changes_since(version)
+        
+        version = self.change_version
+        self.db.run(check, on_success=done, on_error=failed, busy=False)
+        
+    def db_error(self, action):
+        # on_error handler for worker jobs: a write lock held at another
+        # terminal past the busy timeout surfaces as OperationalError
+        def show(error):
+            if isinstance(error, sqlite3.OperationalError):
+                messagebox.showerror("Error", f"{action}: the database is busy at another terminal, please try again")
+            elif isinstance(error, ValueError):
+                messagebox.showerror("Error", str(error))
+            else:
+                messagebox.showerror("Error", f"{action}: {error}")
+        return show
+        
+    def booking_pages(self, query):
+        # PagedTreeview fetch running query(repo, **page) on the worker
+        def fetch(page, done):
+            def failed(error):
+                done(None)
+                self.db_error("Failed to load bookings")(error)
+            
+            self.db.run(lambda repo: query(repo, **page), on_success=done, on_error=failed)
+        return fetch
+        
+    def refresh_changed(self, changes):
+        views = [
+            ('room_tree', ('rooms', 'bookings'), lambda: self.load_rooms(self.room_filter)),
+            ('booking_tree', ('bookings',), self.refresh_bookings),
+            ('billing_tree', ('bookings', 'bills'), self.load_unbilled_bookings),
+            ('staff_tree', ('staff',), self.load_staff_data),
+            ('service_booking_tree', ('bookings',), self.load_active_bookings),
+            ('service_tree', ('services',), self.load_available_services),
+            ('service_manage_tree', ('services',), self.load_all_services),
+        ]
+        # Lists on hidden screens are reloaded when the screen is shown again
+        self.screens.mark_stale(changes)
+        for attr, tables, load in views:
+            tree = getattr(self, attr, None)
+            if (tree is not None and tree.winfo_exists() and self.screens.showing(tree)
+                    and any(table in changes for table in tables)):
+                load()
         
     def create_header(self):
         header_frame = tk.Frame(self.root, bg="#2c3e50", height=70)
@@ -197,6 +155,20 @@ class HotelManagementSystem:
         )
         title_label.pack(pady=15)
         
+        # Busy indicator while the database worker has pending work
+        self.busy_label = tk.Label(
+            header_frame,
+            text="",
+            font=("Helvetica", 10),
+            bg="#2c3e50",
+            fg="#f1c40f"
+        )
+        self.busy_label.place(relx=1.0, rely=0.5, anchor=tk.E, x=-15)
+        
+    def set_busy(self, busy):
+        self.busy_label.config(text="Working..." if busy else "")
+        self.root.config(cursor="watch" if busy else "")
+        
     def create_sidebar(self):
         sidebar_frame = tk.Frame(self.root, bg="#34495e", width=200)
         sidebar_frame.pack(side=tk.LEFT, fill=tk.Y)
@@ -228,22 +200,21 @@ class HotelManagementSystem:
         self.main_frame = tk.Frame(self.root, bg="white")
         self.main_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
         
-        # Create welcome message
-        welcome_label = tk.Label(
-            self.main_frame,
-            text="Welcome to Hotel Management System\nClick 'Room Management' to start",
-            font=("Helvetica", 16),
-            bg="white",
-            fg="#2c3e50"
-        )
-        welcome_label.pack(expand=True)
+        # Each screen is built on first visit and kept (hidden) afterwards
+        self.screens = ScreenManager(self.main_frame, bg="white")
+        self.analytics_view = None
+        self.services_view = None
+        self.show_welcome_screen()
         
     def show_room_management(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "rooms", self.build_room_management,
+            refresh=lambda: self.load_rooms(self.room_filter), tables=('rooms', 'bookings')
+        )
+        
+    def build_room_management(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -260,14 +231,23 @@ class HotelManagementSystem:
         
         # Create Room List
         columns = ('Room Number', 'Type', 'Rate', 'Status', 'Last Updated')
-        self.room_tree = ttk.Treeview(self.main_frame, columns=columns, show='headings')
+        self.room_tree = ttk.Treeview(frame, columns=columns, show='headings')
         
         for col in columns:
             self.room_tree.heading(col, text=col)
             self.room_tree.column(col, width=150)
         
+        # Rows are (room, status) pairs, see load_rooms
+        self.room_rows = TableBinding(
+            self.room_tree,
+            key=lambda row: row[0].room_number,
+            values=lambda row: (
+                row[0].room_number, row[0].room_type, f"${row[0].rate}", row[1], row[0].last_updated
+            )
+        )
+        
         # Create buttons frame
-        buttons_frame = tk.Frame(self.main_frame, bg="white")
+        buttons_frame = tk.Frame(frame, bg="white")
         buttons_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add operation buttons
@@ -315,29 +295,74 @@ class HotelManagementSystem:
             width=15
         )
         book_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Availability search for a stay [check in, check out)
+        search_frame = tk.Frame(frame, bg="white")
+        search_frame.pack(fill=tk.X, padx=20)
+        
+        tk.Label(search_frame, text="Check In (YYYY-MM-DD):", bg="white").pack(side=tk.LEFT, padx=5)
+        check_in_entry = tk.Entry(search_frame, width=12)
+        check_in_entry.pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(search_frame, text="Check Out (YYYY-MM-DD):", bg="white").pack(side=tk.LEFT, padx=5)
+        check_out_entry = tk.Entry(search_frame, width=12)
+        check_out_entry.pack(side=tk.LEFT, padx=5)
+        
+        def find_available():
+            check_in, check_out = check_in_entry.get(), check_out_entry.get()
+            self.db.run(
+                lambda repo: repo.free_rooms(check_in, check_out),
+                on_success=lambda free: self.load_rooms(set(free)),
+                on_error=self.db_error("Availability search failed")
+            )
+        
+        tk.Button(
+            search_frame,
+            text="Find Available",
+            command=find_available,
+            bg="#3498db",
+            fg="white",
+            font=("Helvetica", 10)
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            search_frame,
+            text="Show All",
+            command=lambda: self.load_rooms(),
+            bg="#2c3e50",
+            fg="white",
+            font=("Helvetica", 10)
+        ).pack(side=tk.LEFT, padx=5)
             
         self.room_tree.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
         
         # Load rooms from database
         self.load_rooms()
         
-    def load_rooms(self):
-        self.cursor.execute("SELECT * FROM rooms")
-        rooms = self.cursor.fetchall()
+    def load_rooms(self, room_numbers=None):
+        self.room_filter = room_numbers
+        room_rows = self.room_rows
         
-        for room in rooms:
-            status = "Available" if room[4] else "Occupied"
-            self.room_tree.insert('', tk.END, values=(
-                room[1], room[2], f"${room[3]}", status, room[6]
-            ))
+        def render(result):
+            rooms, occupied = result
+            if not room_rows.tree.winfo_exists():
+                return
+            # Only rows that changed are touched in the widget
+            room_rows.sync(
+                (room, "Occupied" if str(room.room_number) in occupied else "Available")
+                for room in rooms
+                if room_numbers is None or str(room.room_number) in room_numbers
+            )
+        
+        self.db.run(lambda repo: (repo.list_rooms(), repo.occupied_rooms()), on_success=render)
             
     def show_welcome_screen(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show("welcome", self.build_welcome_screen)
+        
+    def build_welcome_screen(self, frame):
         # Create welcome message
         welcome_label = tk.Label(
-            self.main_frame,
+            frame,
             text="Welcome to Hotel Management System\nClick 'Room Management' to start",
             font=("Helvetica", 16),
             bg="white",
@@ -372,7 +397,7 @@ class HotelManagementSystem:
         room_number.pack()
         
         tk.Label(add_window, text="Room Type:").pack(pady=5)
-        room_type = ttk.Combobox(add_window, values=['SINGLE', 'DOUBLE', 'DELUXE', 'SUITE'])
+        room_type = ttk.Combobox(add_window, values=[code for code, _ in Room.ROOM_TYPES])
         room_type.pack()
         
         tk.Label(add_window, text="Rate:").pack(pady=5)
@@ -385,24 +410,23 @@ class HotelManagementSystem:
         
         def save_room():
             try:
-                self.cursor.execute('''
-                    INSERT INTO rooms (room_number, room_type, rate, is_available, description, last_updated)
-                    VALUES (?, ?, ?, 1, ?, ?)
-                ''', (
-                    room_number.get(),
-                    room_type.get(),
-                    float(rate.get()),
-                    description.get("1.0", tk.END),
-                    datetime.now()
-                ))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Room added successfully!")
-                add_window.destroy()
-                self.show_room_management()
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Room number already exists!")
+                room = (room_number.get(), room_type.get(), to_decimal(rate.get()), description.get("1.0", tk.END))
             except ValueError:
                 messagebox.showerror("Error", "Invalid rate value!")
+                return
+            
+            def saved(result):
+                messagebox.showinfo("Success", "Room added successfully!")
+                add_window.destroy()
+                self.load_rooms()
+            
+            def failed(error):
+                if isinstance(error, sqlite3.IntegrityError):
+                    messagebox.showerror("Error", "Room number already exists!")
+                else:
+                    self.db_error("Failed to add room")(error)
+            
+            self.db.run(lambda repo: repo.add_room(*room), on_success=saved, on_error=failed)
                 
         tk.Button(
             add_window,
@@ -419,6 +443,7 @@ class HotelManagementSystem:
             
         selected_item = selection[0]
         room_data = self.room_tree.item(selected_item)['values']
+        room, _ = self.room_rows.row_of(selected_item)
         
         update_window = tk.Toplevel(self.root)
         update_window.title("Update Room")
@@ -448,44 +473,39 @@ class HotelManagementSystem:
         room_number.pack()
         
         tk.Label(update_window, text="Room Type:").pack(pady=5)
-        room_type = ttk.Combobox(update_window, values=['SINGLE', 'DOUBLE', 'DELUXE', 'SUITE'])
+        room_type = ttk.Combobox(update_window, values=[code for code, _ in Room.ROOM_TYPES])
         room_type.set(room_data[1])
         room_type.pack()
         
         tk.Label(update_window, text="Rate:").pack(pady=5)
         rate = tk.Entry(update_window)
-        rate.insert(0, str(room_data[2]).replace('$', ''))
+        rate.insert(0, str(room.rate))
         rate.pack()
         
         tk.Label(update_window, text="Description:").pack(pady=5)
         description = tk.Text(update_window, height=4)
         
-        # Get description from database
-        self.cursor.execute("SELECT description FROM rooms WHERE room_number = ?", (room_data[0],))
-        desc_data = self.cursor.fetchone()
-        if desc_data:
-            description.insert("1.0", desc_data[0])
+        if room.description:
+            description.insert("1.0", room.description)
         description.pack()
         
         def save_updates():
             try:
-                self.cursor.execute('''
-                    UPDATE rooms 
-                    SET room_type = ?, rate = ?, description = ?, last_updated = ?
-                    WHERE room_number = ?
-                ''', (
-                    room_type.get(),
-                    float(rate.get()),
-                    description.get("1.0", tk.END),
-                    datetime.now(),
-                    room_data[0]
-                ))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Room updated successfully!")
-                update_window.destroy()
-                self.show_room_management()
+                values = (room.room_number, room_type.get(), to_decimal(rate.get()), description.get("1.0", tk.END))
             except ValueError:
                 messagebox.showerror("Error", "Invalid rate value!")
+                return
+            
+            def saved(result):
+                messagebox.showinfo("Success", "Room updated successfully!")
+                update_window.destroy()
+                self.load_rooms()
+            
+            self.db.run(
+                lambda repo: repo.update_room(*values),
+                on_success=saved,
+                on_error=self.db_error("Failed to update room")
+            )
                 
         tk.Button(
             update_window,
@@ -501,21 +521,28 @@ class HotelManagementSystem:
             return
             
         selected_item = selection[0]
-        room_number = self.room_tree.item(selected_item)['values'][0]
+        room_number = self.room_rows.key_of(selected_item)
         
         if messagebox.askyesno("Confirm", "Are you sure you want to remove this room?"):
-            self.cursor.execute("DELETE FROM rooms WHERE room_number = ?", (room_number,))
-            self.conn.commit()
-            
-            self.show_room_management()
-            messagebox.showinfo("Success", "Room removed successfully!")
+            def removed(result):
+                self.room_rows.remove(room_number)
+                messagebox.showinfo("Success", "Room removed successfully!")
+            
+            self.db.run(
+                lambda repo: repo.remove_room(room_number),
+                on_success=removed,
+                on_error=self.db_error("Failed to remove room")
+            )
 
     def show_billing_system(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "billing", self.build_billing_system,
+            refresh=self.load_unbilled_bookings, tables=('bookings', 'bills')
+        )
+        
+    def build_billing_system(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -541,7 +568,7 @@ class HotelManagementSystem:
         title_label.pack(pady=10)
         
         # Create main content frame
-        content_frame = tk.Frame(self.main_frame, bg="white")
+        content_frame = tk.Frame(frame, bg="white")
         content_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
         # Left side - Booking selection and billing details
@@ -558,6 +585,19 @@ class HotelManagementSystem:
         for col in columns:
             self.billing_tree.heading(col, text=col)
             self.billing_tree.column(col, width=100)
+        
+        self.billing_rows = TableBinding(
+            self.billing_tree,
+            key=lambda booking: booking.id,
+            values=lambda booking: (
+                booking.id,
+                booking.room_number,
+                booking.customer_name,
+                booking.check_in_date,
+                booking.check_out_date,
+                f"${booking.total_amount:.2f}"
+            )
+        )
             
         self.billing_tree.pack(fill=tk.X, pady=10)
         
@@ -575,25 +615,34 @@ class HotelManagementSystem:
         details_frame.pack(fill=tk.X, padx=10)
         
         # Variables for billing
+        self.folio = None
+        self.room_charges_var = tk.StringVar(value="$0.00")
+        self.service_charges_var = tk.StringVar(value="$0.00")
         self.subtotal_var = tk.StringVar(value="$0.00")
         self.tax_var = tk.StringVar(value="$0.00")
         self.discount_var = tk.StringVar(value="$0.00")
         self.total_var = tk.StringVar(value="$0.00")
         
         # Labels and entries
-        tk.Label(details_frame, text="Subtotal:", bg="white").grid(row=0, column=0, sticky=tk.W, pady=2)
-        tk.Label(details_frame, textvariable=self.subtotal_var, bg="white").grid(row=0, column=1, sticky=tk.W, pady=2)
+        tk.Label(details_frame, text="Room Charges:", bg="white").grid(row=0, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, textvariable=self.room_charges_var, bg="white").grid(row=0, column=1, sticky=tk.W, pady=2)
         
-        tk.Label(details_frame, text="Tax (10%):", bg="white").grid(row=1, column=0, sticky=tk.W, pady=2)
-        tk.Label(details_frame, textvariable=self.tax_var, bg="white").grid(row=1, column=1, sticky=tk.W, pady=2)
+        tk.Label(details_frame, text="Services:", bg="white").grid(row=1, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, textvariable=self.service_charges_var, bg="white").grid(row=1, column=1, sticky=tk.W, pady=2)
         
-        tk.Label(details_frame, text="Discount:", bg="white").grid(row=2, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, text="Subtotal:", bg="white").grid(row=2, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, textvariable=self.subtotal_var, bg="white").grid(row=2, column=1, sticky=tk.W, pady=2)
+        
+        tk.Label(details_frame, text="Tax (10%):", bg="white").grid(row=3, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, textvariable=self.tax_var, bg="white").grid(row=3, column=1, sticky=tk.W, pady=2)
+        
+        tk.Label(details_frame, text="Discount:", bg="white").grid(row=4, column=0, sticky=tk.W, pady=2)
         self.discount_entry = tk.Entry(details_frame, width=10)
-        self.discount_entry.grid(row=2, column=1, sticky=tk.W, pady=2)
+        self.discount_entry.grid(row=4, column=1, sticky=tk.W, pady=2)
         self.discount_entry.insert(0, "0")
         
-        tk.Label(details_frame, text="Total:", bg="white", font=("Helvetica", 10, "bold")).grid(row=3, column=0, sticky=tk.W, pady=2)
-        tk.Label(details_frame, textvariable=self.total_var, bg="white", font=("Helvetica", 10, "bold")).grid(row=3, column=1, sticky=tk.W, pady=2)
+        tk.Label(details_frame, text="Total:", bg="white", font=("Helvetica", 10, "bold")).grid(row=5, column=0, sticky=tk.W, pady=2)
+        tk.Label(details_frame, textvariable=self.total_var, bg="white", font=("Helvetica", 10, "bold")).grid(row=5, column=1, sticky=tk.W, pady=2)
         
         # Calculate button
         tk.Button(
@@ -652,11 +701,14 @@ class HotelManagementSystem:
         ).pack(side=tk.LEFT, padx=5)
 
     def show_booking_history(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "bookings", self.build_booking_history,
+            refresh=self.refresh_bookings, tables=('bookings',)
+        )
+        
+    def build_booking_history(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -682,37 +734,59 @@ class HotelManagementSystem:
         title_label.pack(pady=10)
         
         # Create Booking List
+        list_frame = tk.Frame(frame, bg="white")
+        list_frame.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
+        
         columns = ('Room Number', 'Customer Name', 'Phone', 'Check In', 'Check Out', 'Amount', 'Booking Date')
-        self.booking_tree = ttk.Treeview(self.main_frame, columns=columns, show='headings')
+        self.booking_tree = ttk.Treeview(list_frame, columns=columns, show='headings')
         
         # Set column headings and widths
         for col in columns:
             self.booking_tree.heading(col, text=col)
             self.booking_tree.column(col, width=140)
             
-        self.booking_tree.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.booking_tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.booking_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Load pages of history as the user scrolls
+        self.booking_pager = PagedTreeview(
+            self.booking_tree,
+            fetch=self.booking_pages(HotelRepository.booking_page),
+            key=lambda booking: (booking.booking_date, booking.id),
+            values=lambda booking: (
+                booking.room_number,
+                booking.customer_name,
+                booking.customer_phone,
+                booking.check_in_date,
+                booking.check_out_date,
+                f"${booking.total_amount:.2f}",
+                booking.booking_date
+            ),
+            scrollbar=scrollbar
+        )
         
         # Add search frame
-        search_frame = tk.Frame(self.main_frame, bg="white")
+        search_frame = tk.Frame(frame, bg="white")
         search_frame.pack(fill=tk.X, padx=20, pady=10)
         
-        tk.Label(search_frame, text="Search by Customer Name:", bg="white").pack(side=tk.LEFT, padx=5)
+        tk.Label(search_frame, text="Search by Name, Phone or Room:", bg="white").pack(side=tk.LEFT, padx=5)
         search_entry = tk.Entry(search_frame)
         search_entry.pack(side=tk.LEFT, padx=5)
         
         def search_bookings():
-            # Clear current items
-            for item in self.booking_tree.get_children():
-                self.booking_tree.delete(item)
-                
-            search_term = f"%{search_entry.get()}%"
-            self.cursor.execute('''
-                SELECT * FROM bookings 
-                WHERE customer_name LIKE ? 
-                ORDER BY booking_date DESC
-            ''', (search_term,))
-            
-            self.load_booking_data()
+            self.booking_search = search_entry.get()
+            self.refresh_bookings()
+        
+        # Search as you type, once typing pauses
+        pending_search = [None]
+        
+        def schedule_search(event):
+            if pending_search[0] is not None:
+                search_entry.after_cancel(pending_search[0])
+            pending_search[0] = search_entry.after(150, search_bookings)
+        
+        search_entry.bind('<KeyRelease>', schedule_search)
         
         tk.Button(
             search_frame,
@@ -736,26 +810,23 @@ class HotelManagementSystem:
         self.load_booking_data()
         
     def load_booking_data(self):
-        # Clear current items
-        for item in self.booking_tree.get_children():
-            self.booking_tree.delete(item)
-            
-        self.cursor.execute('''
-            SELECT * FROM bookings 
-            ORDER BY booking_date DESC
-        ''')
-        bookings = self.cursor.fetchall()
-        
-        for booking in bookings:
-            self.booking_tree.insert('', tk.END, values=(
-                booking[1],  # room_number
-                booking[2],  # customer_name
-                booking[3],  # customer_phone
-                booking[4],  # check_in_date
-                booking[5],  # check_out_date
-                f"${booking[6]:.2f}",  # total_amount
-                booking[7]   # booking_date
-            ))
+        self.booking_search = ""
+        self.refresh_bookings()
+        
+    def refresh_bookings(self):
+        # Reloads from the top, keeping any active search, e.g. when another
+        # terminal books a room while Booking History is open
+        term = self.booking_search
+        if term.strip():
+            self.booking_pager.reset(
+                self.booking_pages(lambda repo, **page: repo.search_bookings(term, **page)),
+                key=lambda booking: booking.id
+            )
+        else:
+            self.booking_pager.reset(
+                self.booking_pages(HotelRepository.booking_page),
+                key=lambda booking: (booking.booking_date, booking.id)
+            )
 
     def show_book_room(self, selection):
         if not selection:
@@ -765,11 +836,6 @@ class HotelManagementSystem:
         selected_item = selection[0]
         room_data = self.room_tree.item(selected_item)['values']
         
-        # Check if room is available
-        if room_data[3] != "Available":
-            messagebox.showerror("Error", "This room is not available for booking")
-            return
-        
         book_window = tk.Toplevel(self.root)
         book_window.title(f"Book Room {room_data[0]}")
         book_window.geometry("400x600")
@@ -819,54 +885,21 @@ class HotelManagementSystem:
         check_out.pack(fill=tk.X)
         
         def save_booking():
-            try:
-                # Validate dates
-                check_in_date = datetime.strptime(check_in.get(), "%Y-%m-%d")
-                check_out_date = datetime.strptime(check_out.get(), "%Y-%m-%d")
-                
-                if check_in_date >= check_out_date:
-                    messagebox.showerror("Error", "Check-out date must be after check-in date")
-                    return
-                
-                if check_in_date < datetime.now():
-                    messagebox.showerror("Error", "Check-in date cannot be in the past")
-                    return
-                
-                # Calculate total amount
-                days = (check_out_date - check_in_date).days
-                rate = float(room_data[2].replace('$', ''))
-                total_amount = days * rate
-                
-                # Save booking
-                self.cursor.execute('''
-                    INSERT INTO bookings (
-                        room_number, customer_name, customer_phone,
-                        check_in_date, check_out_date, total_amount, booking_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    room_data[0],
-                    customer_name.get(),
-                    phone.get(),
-                    check_in.get(),
-                    check_out.get(),
-                    total_amount,
-                    datetime.now()
-                ))
-                
-                # Update room availability
-                self.cursor.execute('''
-                    UPDATE rooms 
-                    SET is_available = 0, last_updated = ?
-                    WHERE room_number = ?
-                ''', (datetime.now(), room_data[0]))
-                
-                self.conn.commit()
+            booking = (str(room_data[0]), customer_name.get(), phone.get(), check_in.get(), check_out.get())
+            
+            def booked(result):
+                booking_id, total_amount = result
                 messagebox.showinfo("Success", f"Room booked successfully!\nTotal Amount: ${total_amount:.2f}")
                 book_window.destroy()
-                self.show_room_management()
-                
-            except ValueError as e:
-                messagebox.showerror("Error", "Invalid date format. Please use YYYY-MM-DD")
+                self.load_rooms()
+            
+            # Validates dates and takes the write lock on the worker, so a
+            # lock held at another terminal never freezes the window
+            self.db.run(
+                lambda repo: repo.book_room(*booking),
+                on_success=booked,
+                on_error=self.db_error("Failed to book room")
+            )
                 
         tk.Button(
             form_frame,
@@ -878,29 +911,14 @@ class HotelManagementSystem:
         ).pack(pady=20)
 
     def load_unbilled_bookings(self):
-        # Clear current items
-        for item in self.billing_tree.get_children():
-            self.billing_tree.delete(item)
-            
-        self.cursor.execute('''
-            SELECT b.id, b.room_number, b.customer_name, b.check_in_date, 
-                   b.check_out_date, b.total_amount
-            FROM bookings b
-            LEFT JOIN bills bi ON b.id = bi.booking_id
-            WHERE bi.id IS NULL
-            ORDER BY b.booking_date DESC
-        ''')
-        bookings = self.cursor.fetchall()
-        
-        for booking in bookings:
-            self.billing_tree.insert('', tk.END, values=(
-                booking[0],  # booking_id
-                booking[1],  # room_number
-                booking[2],  # customer_name
-                booking[3],  # check_in_date
-                booking[4],  # check_out_date
-                f"${booking[5]:.2f}"  # total_amount
-            ))
+        billing_rows = self.billing_rows
+        
+        def render(bookings):
+            if not billing_rows.tree.winfo_exists():
+                return
+            billing_rows.sync(bookings)
+        
+        self.db.run(lambda repo: repo.list_unbilled_bookings(), on_success=render)
 
     def calculate_bill(self):
         selection = self.billing_tree.selection()
@@ -909,49 +927,43 @@ class HotelManagementSystem:
             return
             
         selected_item = selection[0]
-        booking_data = self.billing_tree.item(selected_item)['values']
-        
-        # Get subtotal from booking
-        subtotal = float(booking_data[5].replace('$', ''))
-        
-        # Calculate tax
-        tax = subtotal * TAX_RATE
-        
-        # Get discount
+        booking_id = self.billing_rows.key_of(selected_item)
         try:
-            discount = float(self.discount_entry.get())
+            discount = to_decimal(self.discount_entry.get())
         except ValueError:
             messagebox.showerror("Error", "Invalid discount amount")
             return
         
-        # Calculate total
-        total = subtotal + tax - discount
-        
-        # Update display
-        self.subtotal_var.set(f"${subtotal:.2f}")
-        self.tax_var.set(f"${tax:.2f}")
-        self.discount_var.set(f"${discount:.2f}")
-        self.total_var.set(f"${total:.2f}")
+        def show(folio):
+            if folio is None:
+                messagebox.showerror("Error", "Booking not found")
+                return
+            self.folio = folio
+            
+            # Update display
+            self.room_charges_var.set(f"${folio.room_charges}")
+            self.service_charges_var.set(f"${folio.service_charges}")
+            self.subtotal_var.set(f"${folio.subtotal}")
+            self.tax_var.set(f"${folio.tax}")
+            self.discount_var.set(f"${folio.discount}")
+            self.total_var.set(f"${folio.total}")
+        
+        def failed(error):
+            if isinstance(error, ArithmeticError):
+                messagebox.showerror("Error", "Invalid discount amount")
+            else:
+                self.db_error("Failed to calculate bill")(error)
+        
+        # Room charges plus service requests, with tax and discount in Decimal
+        self.db.run(lambda repo: repo.folio(booking_id, discount), on_success=show, on_error=failed)
 
     def generate_payment_qr(self):
-        total = self.total_var.get().replace('$', '')
-        if total == "0.00":
+        if self.folio is None:
             messagebox.showwarning("Warning", "Please calculate the bill first")
             return
             
-        # Generate QR code
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(f"Amount: {total}")
-        qr.make(fit=True)
-        
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-        qr_image = qr_image.resize((200, 200))
-        
-        # Save QR code
-        qr_image.save(QR_CODE_PATH)
-        
-        # Display QR code
-        qr_photo = ImageTk.PhotoImage(Image.open(QR_CODE_PATH))
+        # Display QR code straight from the cached PNG (no temp file)
+        qr_photo = tk.PhotoImage(data=render_qr_png(f"Amount: {self.folio.total}"))
         self.qr_label.configure(image=qr_photo)
         self.qr_label.image = qr_photo
 
@@ -961,7 +973,7 @@ class HotelManagementSystem:
             messagebox.showwarning("Warning", "Please select a booking to generate invoice")
             return
             
-        if self.total_var.get() == "$0.00":
+        if self.folio is None:
             messagebox.showwarning("Warning", "Please calculate the bill first")
             return
             
@@ -1013,38 +1025,29 @@ class HotelManagementSystem:
             messagebox.showwarning("Warning", "Please select a booking to process payment")
             return
             
-        if self.total_var.get() == "$0.00":
+        if self.folio is None:
             messagebox.showwarning("Warning", "Please calculate the bill first")
             return
             
         selected_item = selection[0]
-        booking_data = self.billing_tree.item(selected_item)['values']
+        booking_id = self.billing_tree.item(selected_item)['values'][0]
+        folio = self.folio
+        if folio is None or folio.booking_id != booking_id:
+            messagebox.showwarning("Warning", "Please calculate the bill first")
+            return
         
-        try:
-            # Save bill to database
-            self.cursor.execute('''
-                INSERT INTO bills (
-                    booking_id, subtotal, tax_amount, discount_amount,
-                    total_amount, payment_status, payment_method, bill_date
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                booking_data[0],  # booking_id
-                float(self.subtotal_var.get().replace('$', '')),
-                float(self.tax_var.get().replace('$', '')),
-                float(self.discount_var.get().replace('$', '')),
-                float(self.total_var.get().replace('$', '')),
-                'Paid',
-                self.payment_method.get(),
-                datetime.now()
-            ))
-            
-            self.conn.commit()
+        def paid(bill_id):
             messagebox.showinfo("Success", "Payment processed successfully!")
+            if not self.billing_tree.winfo_exists():
+                return
             
-            # Refresh the billing list
-            self.load_unbilled_bookings()
+            # The booking is billed now; drop just its row
+            self.billing_rows.remove(folio.booking_id)
             
             # Clear the current calculation
+            self.folio = None
+            self.room_charges_var.set("$0.00")
+            self.service_charges_var.set("$0.00")
             self.subtotal_var.set("$0.00")
             self.tax_var.set("$0.00")
             self.discount_var.set("$0.00")
@@ -1055,15 +1058,23 @@ class HotelManagementSystem:
             # Clear QR code if displayed
             self.qr_label.configure(image='')
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to process payment: {str(e)}")
+        # Save bill to database
+        payment_method = self.payment_method.get()
+        self.db.run(
+            lambda repo: repo.bill_folio(folio, payment_method),
+            on_success=paid,
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to process payment: {str(e)}")
+        )
 
     def show_staff_management(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "staff", self.build_staff_management,
+            refresh=self.load_staff_data, tables=('staff',)
+        )
+        
+    def build_staff_management(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -1089,7 +1100,7 @@ class HotelManagementSystem:
         title_label.pack(pady=10)
         
         # Create buttons frame
-        buttons_frame = tk.Frame(self.main_frame, bg="white")
+        buttons_frame = tk.Frame(frame, bg="white")
         buttons_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add operation buttons
@@ -1128,11 +1139,26 @@ class HotelManagementSystem:
         
         # Create Staff List
         columns = ('ID', 'Name', 'Position', 'Phone', 'Email', 'Join Date', 'Base Salary', 'Status')
-        self.staff_tree = ttk.Treeview(self.main_frame, columns=columns, show='headings')
+        self.staff_tree = ttk.Treeview(frame, columns=columns, show='headings')
         
         for col in columns:
             self.staff_tree.heading(col, text=col)
             self.staff_tree.column(col, width=120)
+        
+        self.staff_rows = TableBinding(
+            self.staff_tree,
+            key=lambda employee: employee.employee_id,
+            values=lambda employee: (
+                employee.employee_id,
+                employee.name,
+                employee.position,
+                employee.phone,
+                employee.email,
+                employee.join_date,
+                f"${employee.base_salary:.2f}",
+                employee.status
+            )
+        )
             
         self.staff_tree.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
         
@@ -1140,24 +1166,13 @@ class HotelManagementSystem:
         self.load_staff_data()
 
     def load_staff_data(self):
-        # Clear current items
-        for item in self.staff_tree.get_children():
-            self.staff_tree.delete(item)
-            
-        self.cursor.execute('SELECT * FROM staff ORDER BY name')
-        staff = self.cursor.fetchall()
-        
-        for employee in staff:
-            self.staff_tree.insert('', tk.END, values=(
-                employee[1],  # employee_id
-                employee[2],  # name
-                employee[3],  # position
-                employee[4],  # phone
-                employee[5],  # email
-                employee[7],  # join_date
-                f"${employee[8]:.2f}",  # base_salary
-                employee[9]   # status
-            ))
+        staff_rows = self.staff_rows
+        
+        def render(staff):
+            if staff_rows.tree.winfo_exists():
+                staff_rows.sync(staff)
+        
+        self.db.run(lambda repo: repo.list_staff(), on_success=render)
 
     def show_add_staff(self):
         add_window = tk.Toplevel(self.root)
@@ -1225,35 +1240,36 @@ class HotelManagementSystem:
                 )
                 
                 # Validate salary
-                base_salary = float(self.staff_entries["Base Salary:"].get())
-                
-                # Insert into database
-                self.cursor.execute('''
-                    INSERT INTO staff (
-                        employee_id, name, position, phone, email,
-                        address, join_date, base_salary, status
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.staff_entries["Employee ID:"].get(),
-                    self.staff_entries["Name:"].get(),
-                    self.staff_entries["Position:"].get(),
-                    self.staff_entries["Phone:"].get(),
-                    self.staff_entries["Email:"].get(),
-                    self.staff_entries["Address:"].get("1.0", tk.END),
-                    self.staff_entries["Join Date (YYYY-MM-DD):"].get(),
-                    base_salary,
-                    self.staff_entries["Status:"].get()
-                ))
-                
-                self.conn.commit()
+                base_salary = to_decimal(self.staff_entries["Base Salary:"].get())
+            except ValueError:
+                messagebox.showerror("Error", "Invalid date format or salary value")
+                return
+            
+            employee = (
+                self.staff_entries["Employee ID:"].get(),
+                self.staff_entries["Name:"].get(),
+                self.staff_entries["Position:"].get(),
+                self.staff_entries["Phone:"].get(),
+                self.staff_entries["Email:"].get(),
+                self.staff_entries["Address:"].get("1.0", tk.END),
+                join_date,
+                base_salary,
+                self.staff_entries["Status:"].get()
+            )
+            
+            def saved(result):
                 messagebox.showinfo("Success", "Staff member added successfully!")
                 add_window.destroy()
                 self.load_staff_data()
-                
-            except ValueError:
-                messagebox.showerror("Error", "Invalid date format or salary value")
-            except sqlite3.IntegrityError:
-                messagebox.showerror("Error", "Employee ID already exists")
+            
+            def failed(error):
+                if isinstance(error, sqlite3.IntegrityError):
+                    messagebox.showerror("Error", "Employee ID already exists")
+                else:
+                    self.db_error("Failed to add staff member")(error)
+            
+            # Insert into database
+            self.db.run(lambda repo: repo.add_staff(*employee), on_success=saved, on_error=failed)
         
         # Save button
         tk.Button(
@@ -1272,6 +1288,7 @@ class HotelManagementSystem:
             
         selected_item = selection[0]
         staff_data = self.staff_tree.item(selected_item)['values']
+        employee = self.staff_rows.row_of(selected_item)
         
         salary_window = tk.Toplevel(self.root)
         salary_window.title(f"Process Salary - {staff_data[1]}")
@@ -1312,7 +1329,7 @@ class HotelManagementSystem:
         # Base salary (readonly)
         tk.Label(details_frame, text="Base Salary:").grid(row=0, column=0, pady=5, sticky=tk.W)
         base_salary = tk.Entry(details_frame)
-        base_salary.insert(0, staff_data[6].replace('$', ''))
+        base_salary.insert(0, str(employee.base_salary))
         base_salary.config(state='readonly')
         base_salary.grid(row=0, column=1, pady=5, padx=5)
         
@@ -1341,45 +1358,40 @@ class HotelManagementSystem:
         
         def calculate_salary():
             try:
-                base = float(base_salary.get())
-                bonus = float(bonus_entry.get())
-                deductions = float(deductions_entry.get())
-                net_salary = base + bonus - deductions
+                bonus = to_decimal(bonus_entry.get())
+                deductions = to_decimal(deductions_entry.get())
+                net_salary = employee.base_salary + bonus - deductions
                 
-                result_label.config(text=f"Net Salary: ${net_salary:.2f}")
-                return net_salary
+                result_label.config(text=f"Net Salary: ${net_salary}")
+                return bonus, deductions
             except ValueError:
                 messagebox.showerror("Error", "Invalid numeric values")
                 return None
         
         def save_salary():
-            net_salary = calculate_salary()
-            if net_salary is None:
+            amounts = calculate_salary()
+            if amounts is None:
                 return
+            bonus, deductions = amounts
                 
-            try:
-                self.cursor.execute('''
-                    INSERT INTO salary_payments (
-                        employee_id, payment_date, base_salary, bonus,
-                        deductions, net_salary, payment_method, remarks
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    staff_data[0],  # employee_id
-                    datetime.now().strftime('%Y-%m-%d'),
-                    float(base_salary.get()),
-                    float(bonus_entry.get()),
-                    float(deductions_entry.get()),
-                    net_salary,
-                    payment_method.get(),
-                    remarks.get("1.0", tk.END)
-                ))
-                
-                self.conn.commit()
+            payment = (
+                employee.employee_id,
+                employee.base_salary,
+                bonus,
+                deductions,
+                payment_method.get(),
+                remarks.get("1.0", tk.END)
+            )
+            
+            def paid(result):
                 messagebox.showinfo("Success", "Salary processed successfully!")
                 salary_window.destroy()
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to process salary: {str(e)}")
+            
+            self.db.run(
+                lambda repo: repo.create_salary_payment(*payment),
+                on_success=paid,
+                on_error=self.db_error("Failed to process salary")
+            )
         
         # Calculate button
         tk.Button(
@@ -1451,33 +1463,32 @@ class HotelManagementSystem:
         history_tree.pack(pady=20, padx=20, fill=tk.BOTH, expand=True)
         
         # Load salary history
-        self.cursor.execute('''
-            SELECT payment_date, base_salary, bonus, deductions,
-                   net_salary, payment_method, remarks
-            FROM salary_payments
-            WHERE employee_id = ?
-            ORDER BY payment_date DESC
-        ''', (staff_data[0],))
-        
-        payments = self.cursor.fetchall()
-        
-        for payment in payments:
-            history_tree.insert('', tk.END, values=(
-                payment[0],
-                f"${payment[1]:.2f}",
-                f"${payment[2]:.2f}",
-                f"${payment[3]:.2f}",
-                f"${payment[4]:.2f}",
-                payment[5],
-                payment[6]
-            ))
+        def render(payments):
+            if not history_tree.winfo_exists():
+                return
+            for payment in payments:
+                history_tree.insert('', tk.END, values=(
+                    payment.payment_date,
+                    f"${payment.base_salary:.2f}",
+                    f"${payment.bonus:.2f}",
+                    f"${payment.deductions:.2f}",
+                    f"${payment.net_salary:.2f}",
+                    payment.payment_method,
+                    payment.remarks
+                ))
+        
+        employee_id = self.staff_rows.row_of(selected_item).employee_id
+        self.db.run(lambda repo: repo.list_salary_payments(employee_id), on_success=render)
 
     def show_reports_analytics(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "reports", self.build_reports_analytics,
+            refresh=self.refresh_analytics, tables=('rooms', 'bookings', 'bills')
+        )
+        
+    def build_reports_analytics(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -1503,7 +1514,7 @@ class HotelManagementSystem:
         title_label.pack(pady=10)
         
         # Create buttons frame
-        buttons_frame = tk.Frame(self.main_frame, bg="white")
+        buttons_frame = tk.Frame(frame, bg="white")
         buttons_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add operation buttons
@@ -1551,8 +1562,19 @@ class HotelManagementSystem:
         )
         revenue_btn.pack(side=tk.LEFT, padx=5)
         
+        occupancy_btn = tk.Button(
+            buttons_frame,
+            text="Occupancy",
+            command=self.show_occupancy_report,
+            bg="#16a085",
+            fg="white",
+            font=("Helvetica", 10),
+            width=15
+        )
+        occupancy_btn.pack(side=tk.LEFT, padx=5)
+        
         # Create main content frame
-        self.analytics_frame = tk.Frame(self.main_frame, bg="white")
+        self.analytics_frame = tk.Frame(frame, bg="white")
         self.analytics_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
         # Show welcome message
@@ -1565,7 +1587,13 @@ class HotelManagementSystem:
         )
         welcome_label.pack(expand=True)
 
+    def refresh_analytics(self):
+        # Back on the reports screen after bookings or bills changed
+        if self.analytics_view is not None:
+            self.analytics_view()
+        
     def show_weekly_analytics(self):
+        self.analytics_view = self.show_weekly_analytics
         for widget in self.analytics_frame.winfo_children():
             widget.destroy()
             
@@ -1587,51 +1615,46 @@ class HotelManagementSystem:
             fg="#2c3e50"
         ).pack(pady=10)
         
-        # Get analytics data
-        self.cursor.execute('''
-            SELECT 
-                COUNT(*) as total_bookings,
-                SUM(total_amount) as total_revenue,
-                AVG(total_amount) as average_booking_value,
-                COUNT(*) * 100.0 / (SELECT COUNT(*) FROM rooms) as occupancy_rate
-            FROM bookings
-            WHERE booking_date BETWEEN ? AND ?
-        ''', (week_start.strftime('%Y-%m-%d'), week_end.strftime('%Y-%m-%d')))
-        
-        analytics = self.cursor.fetchone()
-        
-        # Display analytics
-        metrics_frame = tk.Frame(analytics_frame, bg="white")
-        metrics_frame.pack(fill=tk.X, pady=10)
-        
-        metrics = [
-            ("Total Bookings", analytics[0] or 0),
-            ("Total Revenue", f"${analytics[1] or 0:.2f}"),
-            ("Average Booking Value", f"${analytics[2] or 0:.2f}"),
-            ("Occupancy Rate", f"{analytics[3] or 0:.1f}%")
-        ]
+        def render(analytics):
+            if not analytics_frame.winfo_exists():
+                return
+        
+            # Display analytics
+            metrics_frame = tk.Frame(analytics_frame, bg="white")
+            metrics_frame.pack(fill=tk.X, pady=10)
+        
+            metrics = [
+                ("Total Bookings", analytics[0] or 0),
+                ("Total Revenue", f"${analytics[1] or 0:.2f}"),
+                ("Average Booking Value", f"${analytics[2] or 0:.2f}"),
+                ("Occupancy Rate", f"{analytics[3] or 0:.1f}%")
+            ]
         
-        for i, (label, value) in enumerate(metrics):
-            metric_frame = tk.Frame(metrics_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
-            metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            for i, (label, value) in enumerate(metrics):
+                metric_frame = tk.Frame(metrics_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
+                metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
             
-            tk.Label(
-                metric_frame,
-                text=label,
-                font=("Helvetica", 10),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(pady=5)
-            
-            tk.Label(
-                metric_frame,
-                text=value,
-                font=("Helvetica", 12, "bold"),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(pady=5)
+                tk.Label(
+                    metric_frame,
+                    text=label,
+                    font=("Helvetica", 10),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(pady=5)
+            
+                tk.Label(
+                    metric_frame,
+                    text=value,
+                    font=("Helvetica", 12, "bold"),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(pady=5)
+        
+        # Get analytics data
+        self.db.run(lambda repo: repo.booking_summary(week_start, week_end), on_success=render)
 
     def show_monthly_analytics(self):
+        self.analytics_view = self.show_monthly_analytics
         for widget in self.analytics_frame.winfo_children():
             widget.destroy()
             
@@ -1656,51 +1679,46 @@ class HotelManagementSystem:
             fg="#2c3e50"
         ).pack(pady=10)
         
-        # Get analytics data
-        self.cursor.execute('''
-            SELECT 
-                COUNT(*) as total_bookings,
-                SUM(total_amount) as total_revenue,
-                AVG(total_amount) as average_booking_value,
-                COUNT(*) * 100.0 / (SELECT COUNT(*) FROM rooms) as occupancy_rate
-            FROM bookings
-            WHERE booking_date BETWEEN ? AND ?
-        ''', (month_start.strftime('%Y-%m-%d'), month_end.strftime('%Y-%m-%d')))
-        
-        analytics = self.cursor.fetchone()
-        
-        # Display analytics
-        metrics_frame = tk.Frame(analytics_frame, bg="white")
-        metrics_frame.pack(fill=tk.X, pady=10)
-        
-        metrics = [
-            ("Total Bookings", analytics[0] or 0),
-            ("Total Revenue", f"${analytics[1] or 0:.2f}"),
-            ("Average Booking Value", f"${analytics[2] or 0:.2f}"),
-            ("Occupancy Rate", f"{analytics[3] or 0:.1f}%")
-        ]
+        def render(analytics):
+            if not analytics_frame.winfo_exists():
+                return
+        
+            # Display analytics
+            metrics_frame = tk.Frame(analytics_frame, bg="white")
+            metrics_frame.pack(fill=tk.X, pady=10)
         
-        for i, (label, value) in enumerate(metrics):
-            metric_frame = tk.Frame(metrics_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
-            metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+            metrics = [
+                ("Total Bookings", analytics[0] or 0),
+                ("Total Revenue", f"${analytics[1] or 0:.2f}"),
+                ("Average Booking Value", f"${analytics[2] or 0:.2f}"),
+                ("Occupancy Rate", f"{analytics[3] or 0:.1f}%")
+            ]
+        
+            for i, (label, value) in enumerate(metrics):
+                metric_frame = tk.Frame(metrics_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
+                metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
             
-            tk.Label(
-                metric_frame,
-                text=label,
-                font=("Helvetica", 10),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(pady=5)
-            
-            tk.Label(
-                metric_frame,
-                text=value,
-                font=("Helvetica", 12, "bold"),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(pady=5)
+                tk.Label(
+                    metric_frame,
+                    text=label,
+                    font=("Helvetica", 10),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(pady=5)
+            
+                tk.Label(
+                    metric_frame,
+                    text=value,
+                    font=("Helvetica", 12, "bold"),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(pady=5)
+        
+        # Get analytics data
+        self.db.run(lambda repo: repo.booking_summary(month_start, month_end), on_success=render)
 
     def show_booking_trends(self):
+        self.analytics_view = self.show_booking_trends
         for widget in self.analytics_frame.winfo_children():
             widget.destroy()
             
@@ -1717,70 +1735,64 @@ class HotelManagementSystem:
             fg="#2c3e50"
         ).pack(pady=10)
         
-        # Get monthly booking trends
-        self.cursor.execute('''
-            SELECT 
-                strftime('%Y-%m', booking_date) as month,
-                COUNT(*) as total_bookings,
-                SUM(total_amount) as total_revenue
-            FROM bookings
-            WHERE booking_date >= date('now', '-6 months')
-            GROUP BY month
-            ORDER BY month
-        ''')
-        
-        trends = self.cursor.fetchall()
-        
-        # Create trends display
-        trends_frame = tk.Frame(analytics_frame, bg="white")
-        trends_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # Create Treeview for trends
-        columns = ('Month', 'Total Bookings', 'Total Revenue')
-        trends_tree = ttk.Treeview(trends_frame, columns=columns, show='headings')
+        def render(trends):
+            if not analytics_frame.winfo_exists():
+                return
         
-        for col in columns:
-            trends_tree.heading(col, text=col)
-            trends_tree.column(col, width=150)
+            # Create trends display
+            trends_frame = tk.Frame(analytics_frame, bg="white")
+            trends_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+            # Create Treeview for trends
+            columns = ('Month', 'Total Bookings', 'Total Revenue')
+            trends_tree = ttk.Treeview(trends_frame, columns=columns, show='headings')
+        
+            for col in columns:
+                trends_tree.heading(col, text=col)
+                trends_tree.column(col, width=150)
             
-        trends_tree.pack(pady=10, fill=tk.BOTH, expand=True)
+            trends_tree.pack(pady=10, fill=tk.BOTH, expand=True)
         
-        # Add data to Treeview
-        for month, bookings, revenue in trends:
-            trends_tree.insert('', tk.END, values=(
-                month,
-                bookings,
-                f"${revenue:.2f}"
-            ))
+            # Add data to Treeview
+            for month, bookings, revenue in trends:
+                trends_tree.insert('', tk.END, values=(
+                    month,
+                    bookings,
+                    f"${revenue:.2f}"
+                ))
         
-        # Calculate growth rates
-        if len(trends) >= 2:
-            current_month = trends[-1]
-            previous_month = trends[-2]
+            # Calculate growth rates
+            if len(trends) >= 2:
+                current_month = trends[-1]
+                previous_month = trends[-2]
             
-            booking_growth = ((current_month[1] - previous_month[1]) / previous_month[1]) * 100
-            revenue_growth = ((current_month[2] - previous_month[2]) / previous_month[2]) * 100
+                booking_growth = ((current_month[1] - previous_month[1]) / previous_month[1]) * 100
+                revenue_growth = ((current_month[2] - previous_month[2]) / previous_month[2]) * 100
             
-            growth_frame = tk.Frame(analytics_frame, bg="white")
-            growth_frame.pack(fill=tk.X, pady=10)
+                growth_frame = tk.Frame(analytics_frame, bg="white")
+                growth_frame.pack(fill=tk.X, pady=10)
             
-            tk.Label(
-                growth_frame,
-                text=f"Booking Growth: {booking_growth:.1f}%",
-                font=("Helvetica", 10),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(side=tk.LEFT, padx=10)
+                tk.Label(
+                    growth_frame,
+                    text=f"Booking Growth: {booking_growth:.1f}%",
+                    font=("Helvetica", 10),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(side=tk.LEFT, padx=10)
             
-            tk.Label(
-                growth_frame,
-                text=f"Revenue Growth: {revenue_growth:.1f}%",
-                font=("Helvetica", 10),
-                bg="white",
-                fg="#2c3e50"
-            ).pack(side=tk.LEFT, padx=10)
+                tk.Label(
+                    growth_frame,
+                    text=f"Revenue Growth: {revenue_growth:.1f}%",
+                    font=("Helvetica", 10),
+                    bg="white",
+                    fg="#2c3e50"
+                ).pack(side=tk.LEFT, padx=10)
+        
+        # Get monthly booking trends
+        self.db.run(lambda repo: repo.booking_trends(), on_success=render)
 
     def show_revenue_analysis(self):
+        self.analytics_view = self.show_revenue_analysis
         for widget in self.analytics_frame.winfo_children():
             widget.destroy()
             
@@ -1797,89 +1809,159 @@ class HotelManagementSystem:
             fg="#2c3e50"
         ).pack(pady=10)
         
-        # Get revenue data
-        self.cursor.execute('''
-            SELECT 
-                strftime('%Y-%m', b.bill_date) as month,
-                SUM(b.total_amount) as total_revenue,
-                SUM(b.tax_amount) as total_tax,
-                SUM(b.discount_amount) as total_discounts
-            FROM bills b
-            WHERE b.bill_date >= date('now', '-12 months')
-            GROUP BY month
-            ORDER BY month
-        ''')
-        
-        revenue_data = self.cursor.fetchall()
-        
-        # Create revenue display
-        revenue_frame = tk.Frame(analytics_frame, bg="white")
-        revenue_frame.pack(fill=tk.BOTH, expand=True, pady=10)
-        
-        # Create Treeview for revenue
-        columns = ('Month', 'Total Revenue', 'Tax', 'Discounts', 'Net Revenue')
-        revenue_tree = ttk.Treeview(revenue_frame, columns=columns, show='headings')
+        def render(revenue_data):
+            if not analytics_frame.winfo_exists():
+                return
         
-        for col in columns:
-            revenue_tree.heading(col, text=col)
-            revenue_tree.column(col, width=120)
+            # Create revenue display
+            revenue_frame = tk.Frame(analytics_frame, bg="white")
+            revenue_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+            # Create Treeview for revenue
+            columns = ('Month', 'Total Revenue', 'Tax', 'Discounts', 'Net Revenue')
+            revenue_tree = ttk.Treeview(revenue_frame, columns=columns, show='headings')
+        
+            for col in columns:
+                revenue_tree.heading(col, text=col)
+                revenue_tree.column(col, width=120)
+            
+            revenue_tree.pack(pady=10, fill=tk.BOTH, expand=True)
+        
+            # Add data to Treeview
+            for month, revenue, tax, discounts in revenue_data:
+                net_revenue = revenue - tax - discounts
+                revenue_tree.insert('', tk.END, values=(
+                    month,
+                    f"${revenue:.2f}",
+                    f"${tax:.2f}",
+                    f"${discounts:.2f}",
+                    f"${net_revenue:.2f}"
+                ))
+        
+            # Calculate summary statistics
+            if revenue_data:
+                total_revenue = sum(row[1] for row in revenue_data)
+                total_tax = sum(row[2] for row in revenue_data)
+                total_discounts = sum(row[3] for row in revenue_data)
+                net_revenue = total_revenue - total_tax - total_discounts
+            
+                summary_frame = tk.Frame(analytics_frame, bg="white")
+                summary_frame.pack(fill=tk.X, pady=10)
+            
+                metrics = [
+                    ("Total Revenue", f"${total_revenue:.2f}"),
+                    ("Total Tax", f"${total_tax:.2f}"),
+                    ("Total Discounts", f"${total_discounts:.2f}"),
+                    ("Net Revenue", f"${net_revenue:.2f}")
+                ]
+            
+                for label, value in metrics:
+                    metric_frame = tk.Frame(summary_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
+                    metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+                
+                    tk.Label(
+                        metric_frame,
+                        text=label,
+                        font=("Helvetica", 10),
+                        bg="white",
+                        fg="#2c3e50"
+                    ).pack(pady=5)
+                
+                    tk.Label(
+                        metric_frame,
+                        text=value,
+                        font=("Helvetica", 12, "bold"),
+                        bg="white",
+                        fg="#2c3e50"
+                    ).pack(pady=5)
+        
+        # Get revenue data
+        self.db.run(lambda repo: repo.revenue_by_month(), on_success=render)
+
+    def show_occupancy_report(self):
+        self.analytics_view = self.show_occupancy_report
+        for widget in self.analytics_frame.winfo_children():
+            widget.destroy()
             
-        revenue_tree.pack(pady=10, fill=tk.BOTH, expand=True)
+        # Last 52 weeks of room-night occupancy
+        week_start = datetime.now().date() - timedelta(days=datetime.now().weekday())
+        start = week_start - timedelta(weeks=51)
+        end = week_start + timedelta(weeks=1)
         
-        # Add data to Treeview
-        for month, revenue, tax, discounts in revenue_data:
-            net_revenue = revenue - tax - discounts
-            revenue_tree.insert('', tk.END, values=(
-                month,
-                f"${revenue:.2f}",
-                f"${tax:.2f}",
-                f"${discounts:.2f}",
-                f"${net_revenue:.2f}"
-            ))
+        # Create analytics display
+        analytics_frame = tk.Frame(self.analytics_frame, bg="white")
+        analytics_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
+        
+        # Title
+        tk.Label(
+            analytics_frame,
+            text=f"Occupancy ({start.strftime('%Y-%m-%d')} to {(end - timedelta(days=1)).strftime('%Y-%m-%d')})",
+            font=("Helvetica", 14, "bold"),
+            bg="white",
+            fg="#2c3e50"
+        ).pack(pady=10)
         
-        # Calculate summary statistics
-        if revenue_data:
-            total_revenue = sum(row[1] for row in revenue_data)
-            total_tax = sum(row[2] for row in revenue_data)
-            total_discounts = sum(row[3] for row in revenue_data)
-            net_revenue = total_revenue - total_tax - total_discounts
+        # Load occupancy
+        self.db.run(
+            lambda repo: (
+                repo.occupancy_by_period(start, end, 'week'),
+                repo.occupancy_by_period(start, end, 'month')
+            ),
+            on_success=lambda periods: self.render_occupancy_report(analytics_frame, *periods)
+        )
+
+    def render_occupancy_report(self, analytics_frame, weekly, monthly):
+        if not analytics_frame.winfo_exists():
+            return
             
-            summary_frame = tk.Frame(analytics_frame, bg="white")
-            summary_frame.pack(fill=tk.X, pady=10)
+        # Weekly occupancy chart
+        chart_height = 160
+        chart = tk.Canvas(analytics_frame, height=chart_height + 20, bg="white", highlightthickness=0)
+        chart.pack(fill=tk.X, pady=10)
+        
+        def draw_chart(event=None):
+            chart.delete("all")
+            width = max(chart.winfo_width(), 1)
+            bar_width = width / max(len(weekly), 1)
+            chart.create_line(0, chart_height, width, chart_height, fill="#95a5a6")
+            for i, (label, occupied, available, rate) in enumerate(weekly):
+                bar_top = chart_height - min(rate, 100) / 100 * chart_height
+                chart.create_rectangle(
+                    i * bar_width + 1, bar_top, (i + 1) * bar_width - 1, chart_height,
+                    fill="#16a085", outline=""
+                )
+            chart.create_text(2, chart_height + 10, text=weekly[0][0] if weekly else "", anchor=tk.W, fill="#2c3e50")
+            chart.create_text(width - 2, chart_height + 10, text=weekly[-1][0] if weekly else "", anchor=tk.E, fill="#2c3e50")
             
-            metrics = [
-                ("Total Revenue", f"${total_revenue:.2f}"),
-                ("Total Tax", f"${total_tax:.2f}"),
-                ("Total Discounts", f"${total_discounts:.2f}"),
-                ("Net Revenue", f"${net_revenue:.2f}")
-            ]
+        chart.bind('<Configure>', draw_chart)
+        
+        # Monthly breakdown
+        columns = ('Month', 'Occupied Room-Nights', 'Available Room-Nights', 'Occupancy')
+        occupancy_tree = ttk.Treeview(analytics_frame, columns=columns, show='headings', height=8)
+        
+        for col in columns:
+            occupancy_tree.heading(col, text=col)
+            occupancy_tree.column(col, width=150)
             
-            for label, value in metrics:
-                metric_frame = tk.Frame(summary_frame, bg="white", relief=tk.GROOVE, borderwidth=1)
-                metric_frame.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-                
-                tk.Label(
-                    metric_frame,
-                    text=label,
-                    font=("Helvetica", 10),
-                    bg="white",
-                    fg="#2c3e50"
-                ).pack(pady=5)
-                
-                tk.Label(
-                    metric_frame,
-                    text=value,
-                    font=("Helvetica", 12, "bold"),
-                    bg="white",
-                    fg="#2c3e50"
-                ).pack(pady=5)
+        occupancy_tree.pack(pady=10, fill=tk.BOTH, expand=True)
+        
+        for month, occupied, available, rate in monthly:
+            occupancy_tree.insert('', tk.END, values=(
+                month,
+                occupied,
+                available,
+                f"{rate:.1f}%"
+            ))
 
     def show_services(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
-            
+        self.screens.show(
+            "services", self.build_services,
+            refresh=self.refresh_services, tables=('bookings', 'services', 'service_requests')
+        )
+        
+    def build_services(self, frame):
         # Create top frame for navigation
-        top_frame = tk.Frame(self.main_frame, bg="white")
+        top_frame = tk.Frame(frame, bg="white")
         top_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add back button
@@ -1905,7 +1987,7 @@ class HotelManagementSystem:
         title_label.pack(pady=10)
         
         # Create buttons frame
-        buttons_frame = tk.Frame(self.main_frame, bg="white")
+        buttons_frame = tk.Frame(frame, bg="white")
         buttons_frame.pack(fill=tk.X, padx=20, pady=10)
         
         # Add operation buttons
@@ -1943,7 +2025,7 @@ class HotelManagementSystem:
         history_btn.pack(side=tk.LEFT, padx=5)
         
         # Create main content frame
-        self.services_frame = tk.Frame(self.main_frame, bg="white")
+        self.services_frame = tk.Frame(frame, bg="white")
         self.services_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
         # Show welcome message
@@ -1956,7 +2038,13 @@ class HotelManagementSystem:
         )
         welcome_label.pack(expand=True)
 
+    def refresh_services(self):
+        # Back on the services screen after its data changed
+        if self.services_view is not None:
+            self.services_view()
+        
     def show_request_service(self):
+        self.services_view = self.show_request_service
         for widget in self.services_frame.winfo_children():
             widget.destroy()
             
@@ -1991,6 +2079,18 @@ class HotelManagementSystem:
         for col in columns:
             self.service_booking_tree.heading(col, text=col)
             self.service_booking_tree.column(col, width=120)
+        
+        self.service_booking_rows = TableBinding(
+            self.service_booking_tree,
+            key=lambda booking: booking.id,
+            values=lambda booking: (
+                booking.id,
+                booking.room_number,
+                booking.customer_name,
+                booking.check_in_date,
+                booking.check_out_date
+            )
+        )
             
         self.service_booking_tree.pack(fill=tk.X, pady=5)
         
@@ -2015,6 +2115,17 @@ class HotelManagementSystem:
         for col in columns:
             self.service_tree.heading(col, text=col)
             self.service_tree.column(col, width=150)
+        
+        self.service_rows = TableBinding(
+            self.service_tree,
+            key=lambda service: service.id,
+            values=lambda service: (
+                service.service_name,
+                service.category,
+                f"${service.price:.2f}",
+                service.description
+            )
+        )
             
         self.service_tree.pack(fill=tk.X, pady=5)
         
@@ -2035,10 +2146,10 @@ class HotelManagementSystem:
         self.notes_text.grid(row=1, column=1, pady=5, padx=5, sticky=tk.W)
         
         # Total amount
-        self.total_var = tk.StringVar(value="$0.00")
+        self.service_total_var = tk.StringVar(value="$0.00")
         tk.Label(
             details_frame,
-            textvariable=self.total_var,
+            textvariable=self.service_total_var,
             font=("Helvetica", 12, "bold"),
             bg="white",
             fg="#2c3e50"
@@ -2065,51 +2176,18 @@ class HotelManagementSystem:
         ).pack(pady=20)
 
     def load_active_bookings(self):
-        # Clear current items
-        for item in self.service_booking_tree.get_children():
-            self.service_booking_tree.delete(item)
-            
-        # Get active bookings
-        self.cursor.execute('''
-            SELECT id, room_number, customer_name, check_in_date, check_out_date
-            FROM bookings
-            WHERE check_out_date >= date('now')
-            ORDER BY check_in_date DESC
-        ''')
-        
-        bookings = self.cursor.fetchall()
-        
-        for booking in bookings:
-            self.service_booking_tree.insert('', tk.END, values=(
-                booking[0],  # booking_id
-                booking[1],  # room_number
-                booking[2],  # customer_name
-                booking[3],  # check_in_date
-                booking[4]   # check_out_date
-            ))
+        rows = self.service_booking_rows
+        self.db.run(
+            lambda repo: repo.list_active_bookings(),
+            on_success=lambda bookings: rows.sync(bookings) if rows.tree.winfo_exists() else None
+        )
 
     def load_available_services(self):
-        # Clear current items
-        for item in self.service_tree.get_children():
-            self.service_tree.delete(item)
-            
-        # Get active services
-        self.cursor.execute('''
-            SELECT id, service_name, category, price, description
-            FROM services
-            WHERE is_active = 1
-            ORDER BY category, service_name
-        ''')
-        
-        services = self.cursor.fetchall()
-        
-        for service in services:
-            self.service_tree.insert('', tk.END, values=(
-                service[1],  # service_name
-                service[2],  # category
-                f"${service[3]:.2f}",  # price
-                service[4]   # description
-            ))
+        rows = self.service_rows
+        self.db.run(
+            lambda repo: repo.list_available_services(),
+            on_success=lambda services: rows.sync(services) if rows.tree.winfo_exists() else None
+        )
 
     def calculate_service_total(self):
         selection = self.service_tree.selection()
@@ -2122,12 +2200,8 @@ class HotelManagementSystem:
             if quantity < 1:
                 raise ValueError("Quantity must be at least 1")
                 
-            selected_item = selection[0]
-            service_data = self.service_tree.item(selected_item)['values']
-            price = float(service_data[2].replace('$', ''))
-            
-            total = price * quantity
-            self.total_var.set(f"${total:.2f}")
+            service = self.service_rows.row_of(selection[0])
+            self.service_total_var.set(f"${service.price * quantity}")
             
         except ValueError as e:
             messagebox.showerror("Error", str(e))
@@ -2145,44 +2219,36 @@ class HotelManagementSystem:
             if quantity < 1:
                 raise ValueError("Quantity must be at least 1")
                 
-            booking_data = self.service_booking_tree.item(booking_selection[0])['values']
-            service_data = self.service_tree.item(service_selection[0])['values']
-            price = float(service_data[2].replace('$', ''))
-            total = price * quantity
-            
-            # Get service ID
-            self.cursor.execute('SELECT id FROM services WHERE service_name = ?', (service_data[0],))
-            service_id = self.cursor.fetchone()[0]
-            
-            # Save service request
-            self.cursor.execute('''
-                INSERT INTO service_requests (
-                    booking_id, service_id, quantity, total_amount,
-                    request_date, status, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                booking_data[0],  # booking_id
-                service_id,
-                quantity,
-                total,
-                datetime.now(),
-                'Pending',
-                self.notes_text.get("1.0", tk.END)
-            ))
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
             
-            self.conn.commit()
+        booking_id = self.service_booking_rows.key_of(booking_selection[0])
+        service = self.service_rows.row_of(service_selection[0])
+        notes = self.notes_text.get("1.0", tk.END)
+        
+        def submitted(result):
             messagebox.showinfo("Success", "Service request submitted successfully!")
+            if not self.notes_text.winfo_exists():
+                return
             
             # Clear form
             self.quantity_entry.delete(0, tk.END)
             self.quantity_entry.insert(0, "1")
             self.notes_text.delete("1.0", tk.END)
-            self.total_var.set("$0.00")
-            
-        except ValueError as e:
-            messagebox.showerror("Error", str(e))
+            self.service_total_var.set("$0.00")
+        
+        # Save service request
+        self.db.run(
+            lambda repo: repo.create_service_request(
+                booking_id, service.id, quantity, service.price * quantity, notes
+            ),
+            on_success=submitted,
+            on_error=self.db_error("Failed to submit service request")
+        )
 
     def show_manage_services(self):
+        self.services_view = self.show_manage_services
         for widget in self.services_frame.winfo_children():
             widget.destroy()
             
@@ -2244,6 +2310,19 @@ class HotelManagementSystem:
         for col in columns:
             self.service_manage_tree.heading(col, text=col)
             self.service_manage_tree.column(col, width=120)
+        
+        self.service_manage_rows = TableBinding(
+            self.service_manage_tree,
+            key=lambda service: service.id,
+            values=lambda service: (
+                service.id,
+                service.service_name,
+                service.category,
+                f"${service.price:.2f}",
+                service.description,
+                "Active" if service.is_active else "Inactive"
+            )
+        )
             
         self.service_manage_tree.pack(pady=10, fill=tk.BOTH, expand=True)
         
@@ -2251,28 +2330,11 @@ class HotelManagementSystem:
         self.load_all_services()
 
     def load_all_services(self):
-        # Clear current items
-        for item in self.service_manage_tree.get_children():
-            self.service_manage_tree.delete(item)
-            
-        # Get all services
-        self.cursor.execute('''
-            SELECT id, service_name, category, price, description, is_active
-            FROM services
-            ORDER BY category, service_name
-        ''')
-        
-        services = self.cursor.fetchall()
-        
-        for service in services:
-            self.service_manage_tree.insert('', tk.END, values=(
-                service[0],  # id
-                service[1],  # service_name
-                service[2],  # category
-                f"${service[3]:.2f}",  # price
-                service[4],  # description
-                "Active" if service[5] else "Inactive"  # status
-            ))
+        rows = self.service_manage_rows
+        self.db.run(
+            lambda repo: repo.list_all_services(),
+            on_success=lambda services: rows.sync(services) if rows.tree.winfo_exists() else None
+        )
 
     def show_add_service(self):
         add_window = tk.Toplevel(self.root)
@@ -2314,21 +2376,21 @@ class HotelManagementSystem:
         
         def save_service():
             try:
-                self.cursor.execute('''
-                    INSERT INTO services (service_name, category, price, description, is_active)
-                    VALUES (?, ?, ?, ?, 1)
-                ''', (
-                    service_name.get(),
-                    category.get(),
-                    float(price.get()),
-                    description.get("1.0", tk.END)
-                ))
-                self.conn.commit()
+                values = (service_name.get(), category.get(), to_decimal(price.get()), description.get("1.0", tk.END))
+            except ValueError:
+                messagebox.showerror("Error", "Invalid price value!")
+                return
+            
+            def saved(result):
                 messagebox.showinfo("Success", "Service added successfully!")
                 add_window.destroy()
                 self.load_all_services()
-            except ValueError:
-                messagebox.showerror("Error", "Invalid price value!")
+            
+            self.db.run(
+                lambda repo: repo.add_service(*values),
+                on_success=saved,
+                on_error=self.db_error("Failed to add service")
+            )
                 
         tk.Button(
             add_window,
@@ -2344,7 +2406,7 @@ class HotelManagementSystem:
             return
             
         selected_item = selection[0]
-        service_data = self.service_manage_tree.item(selected_item)['values']
+        service = self.service_manage_rows.row_of(selected_item)
         
         update_window = tk.Toplevel(self.root)
         update_window.title("Update Service")
@@ -2369,43 +2431,42 @@ class HotelManagementSystem:
         # Form Fields
         tk.Label(update_window, text="Service Name:").pack(pady=5)
         service_name = tk.Entry(update_window)
-        service_name.insert(0, service_data[1])
+        service_name.insert(0, service.service_name)
         service_name.pack()
         
         tk.Label(update_window, text="Category:").pack(pady=5)
         category = ttk.Combobox(update_window, values=['Cleaning', 'Laundry', 'Food', 'Other'])
-        category.set(service_data[2])
+        category.set(service.category)
         category.pack()
         
         tk.Label(update_window, text="Price:").pack(pady=5)
         price = tk.Entry(update_window)
-        price.insert(0, str(service_data[3]).replace('$', ''))
+        price.insert(0, str(service.price))
         price.pack()
         
         tk.Label(update_window, text="Description:").pack(pady=5)
         description = tk.Text(update_window, height=4)
-        description.insert("1.0", service_data[4])
+        description.insert("1.0", service.description or "")
         description.pack()
         
         def save_updates():
             try:
-                self.cursor.execute('''
-                    UPDATE services 
-                    SET service_name = ?, category = ?, price = ?, description = ?
-                    WHERE id = ?
-                ''', (
-                    service_name.get(),
-                    category.get(),
-                    float(price.get()),
-                    description.get("1.0", tk.END),
-                    service_data[0]
-                ))
-                self.conn.commit()
+                values = (service.id, service_name.get(), category.get(), to_decimal(price.get()),
+                          description.get("1.0", tk.END))
+            except ValueError:
+                messagebox.showerror("Error", "Invalid price value!")
+                return
+            
+            def saved(result):
                 messagebox.showinfo("Success", "Service updated successfully!")
                 update_window.destroy()
                 self.load_all_services()
-            except ValueError:
-                messagebox.showerror("Error", "Invalid price value!")
+            
+            self.db.run(
+                lambda repo: repo.update_service(*values),
+                on_success=saved,
+                on_error=self.db_error("Failed to update service")
+            )
                 
         tk.Button(
             update_window,
@@ -2425,18 +2486,20 @@ class HotelManagementSystem:
         
         current_status = service_data[5]
         new_status = 0 if current_status == "Active" else 1
+        service_id = service_data[0]
         
-        self.cursor.execute('''
-            UPDATE services 
-            SET is_active = ?
-            WHERE id = ?
-        ''', (new_status, service_data[0]))
+        def toggled(result):
+            self.load_all_services()
+            messagebox.showinfo("Success", f"Service status updated to {'Active' if new_status else 'Inactive'}")
         
-        self.conn.commit()
-        self.load_all_services()
-        messagebox.showinfo("Success", f"Service status updated to {'Active' if new_status else 'Inactive'}")
+        self.db.run(
+            lambda repo: repo.set_service_active(service_id, new_status),
+            on_success=toggled,
+            on_error=self.db_error("Failed to update service")
+        )
 
     def show_service_history(self):
+        self.services_view = self.show_service_history
         for widget in self.services_frame.winfo_children():
             widget.destroy()
             
@@ -2463,40 +2526,36 @@ class HotelManagementSystem:
             
         history_tree.pack(pady=10, fill=tk.BOTH, expand=True)
         
+        def render(requests):
+            if not history_tree.winfo_exists():
+                return
+        
+            for request in requests:
+                history_tree.insert('', tk.END, values=(
+                    request[0],  # request_date
+                    request[1],  # room_number
+                    request[2],  # customer_name
+                    request[3],  # service_name
+                    request[4],  # quantity
+                    f"${request[5]:.2f}",  # total_amount
+                    request[6],  # status
+                    request[7]   # notes
+                ))
+        
         # Load service history
-        self.cursor.execute('''
-            SELECT 
-                sr.request_date,
-                b.room_number,
-                b.customer_name,
-                s.service_name,
-                sr.quantity,
-                sr.total_amount,
-                sr.status,
-                sr.notes
-            FROM service_requests sr
-            JOIN bookings b ON sr.booking_id = b.id
-            JOIN services s ON sr.service_id = s.id
-            ORDER BY sr.request_date DESC
-        ''')
-        
-        requests = self.cursor.fetchall()
-        
-        for request in requests:
-            history_tree.insert('', tk.END, values=(
-                request[0],  # request_date
-                request[1],  # room_number
-                request[2],  # customer_name
-                request[3],  # service_name
-                request[4],  # quantity
-                f"${request[5]:.2f}",  # total_amount
-                request[6],  # status
-                request[7]   # notes
-            ))
+        self.db.run(lambda repo: repo.list_service_history(), on_success=render)
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.db.close()
 
 if __name__ == "__main__":
+    if "--serve" in sys.argv:
+        # JSON API instead of the GUI: python hms.py --serve [--port 8080]. This
+        # still needs tkinter importable; headless hosts run api_server.py
+        import api_server
+        sys.exit(api_server.main([arg for arg in sys.argv[1:] if arg != "--serve"]))
     app = HotelManagementSystem()
     app.run()
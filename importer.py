@@ -0,0 +1,155 @@
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import date, datetime
+
+from availability import AvailabilityIndex
+from money import to_decimal
+from repository import HotelRepository, parse_date
+
+BATCH_SIZE = 5000
+
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.read} rows read, {self.imported} imported, {self.rejected} rejected "
+            f"in {self.elapsed:.1f}s ({self.rows_per_sec:,.0f} rows/sec)"
+        )
+
+
+# Stream records from a CSV (with header) or JSONL file
+def read_records(path, file_format=None):
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for line_number, record in enumerate(csv.DictReader(f), start=2):
+                yield line_number, record
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield line_number, json.loads(line)
+
+
+def validate_booking(record, rates, availability):
+    room_number = str(record.get('room_number') or '').strip()
+    customer_name = (record.get('customer_name') or '').strip()
+    if not room_number or not customer_name:
+        raise ValueError("room_number and customer_name are required")
+    if room_number not in rates:
+        raise ValueError(f"Room {room_number} does not exist")
+
+    check_in = parse_date(record.get('check_in_date'))
+    check_out = parse_date(record.get('check_out_date'))
+    if check_in >= check_out:
+        raise ValueError("Check-out date must be after check-in date")
+    if not availability.is_free(room_number, check_in, check_out):
+        raise ValueError(f"Room {room_number} is already booked for these dates")
+
+    total_amount = record.get('total_amount')
+    if total_amount in (None, ''):
+        total_amount = (check_out - check_in).days * rates[room_number]
+    else:
+        total_amount = to_decimal(total_amount)
+
+    booking_date = record.get('booking_date') or datetime.now()
+    if isinstance(booking_date, str):
+        booking_date = datetime.fromisoformat(booking_date)
+
+    return (
+        room_number,
+        customer_name,
+        (record.get('customer_phone') or '').strip(),
+        check_in,
+        check_out,
+        total_amount,
+        booking_date
+    )
+
+
+def import_bookings(repo, records, batch_size=BATCH_SIZE, rejects=None, progress=None):
+    stats = ImportStats()
+    rates = repo.room_rates()
+
+    # Full history, so imported stays are checked against every stored stay
+    availability = AvailabilityIndex.from_connection(repo.conn, since=date.min)
+
+    batch = []
+    for line_number, record in records:
+        stats.read += 1
+        try:
+            row = validate_booking(record, rates, availability)
+        except (ValueError, TypeError) as e:
+            stats.rejected += 1
+            if rejects is not None:
+                rejects.writerow([line_number, str(e), json.dumps(record, default=str)])
+            continue
+
+        # Later rows in the same file must not overlap this one
+        availability.add_booking(row[0], row[3], row[4])
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            repo.insert_bookings(batch)
+            stats.imported += len(batch)
+            batch = []
+            if progress:
+                stats.elapsed = time.perf_counter() - stats.started
+                progress(stats)
+
+    if batch:
+        repo.insert_bookings(batch)
+        stats.imported += len(batch)
+
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import bookings from CSV or JSONL")
+    parser.add_argument('path', help="CSV (with header) or JSONL file of bookings")
+    parser.add_argument('--db', default='hotel.db', help="SQLite database (default: hotel.db)")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: by extension)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows per transaction")
+    parser.add_argument('--rejects', help="Write rejected rows with the reason to this CSV file")
+    args = parser.parse_args(argv)
+
+    repo = HotelRepository.open(args.db)
+    rejects_file = open(args.rejects, 'w', newline='', encoding='utf-8') if args.rejects else None
+    try:
+        rejects = None
+        if rejects_file:
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(['line', 'reason', 'record'])
+
+        stats = import_bookings(
+            repo,
+            read_records(args.path, args.format),
+            batch_size=args.batch_size,
+            rejects=rejects,
+            progress=lambda s: print(s, file=sys.stderr)
+        )
+    finally:
+        if rejects_file:
+            rejects_file.close()
+        repo.close()
+
+    print(stats)
+    return 0 if stats.rejected == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import groupby, islice
+
+from repository import HotelRepository
+
+CHUNK_SIZE = 500
+
+
+class InvoiceStats:
+    def __init__(self):
+        self.rendered = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def invoices_per_sec(self):
+        return self.rendered / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.rendered} invoices in {self.elapsed:.1f}s "
+            f"({self.invoices_per_sec:,.0f} invoices/sec)"
+        )
+
+
+# Group the rows of HotelRepository.invoice_lines into one tuple per booking:
+# (booking columns..., [(service, quantity, amount, request date), ...])
+def group_invoices(lines):
+    for _, rows in groupby(lines, key=lambda row: row[0]):
+        rows = list(rows)
+        services = [row[15:] for row in rows if row[15] is not None or row[17] is not None]
+        yield rows[0][:15] + (services,)
+
+
+def _money(value):
+    return f"${value or 0:.2f}"
+
+
+def render_invoice(invoice, issued=None):
+    (booking_id, room_number, room_type, customer_name, customer_phone,
+     check_in, check_out, room_total, subtotal, tax, discount, total,
+     payment_method, payment_status, bill_date, services) = invoice
+    issued = issued or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    lines = [
+        "HOTEL MANAGEMENT SYSTEM",
+        "=====================",
+        f"Invoice Date: {issued}",
+        "",
+        "Booking Details:",
+        "---------------",
+        f"Booking ID: {booking_id}",
+        f"Room Number: {room_number}" + (f" ({room_type})" if room_type else ""),
+        f"Customer Name: {customer_name}",
+        f"Customer Phone: {customer_phone or ''}",
+        f"Check-in Date: {check_in}",
+        f"Check-out Date: {check_out}",
+        f"Room Charges: {_money(room_total)}",
+    ]
+
+    if services:
+        lines += ["", "Services:", "---------"]
+        for service_name, quantity, amount, request_date in services:
+            lines.append(
+                f"{str(request_date or '')[:10]}  {service_name or 'Service'} x{quantity or 1}: {_money(amount)}"
+            )
+
+    lines += ["", "Billing Details:", "---------------"]
+    if bill_date is None:
+        service_total = sum(service[2] or 0 for service in services)
+        lines += [
+            f"Subtotal: {_money((room_total or 0) + service_total)}",
+            "",
+            "Payment Status: Not yet billed",
+        ]
+    else:
+        lines += [
+            f"Subtotal: {_money(subtotal)}",
+            f"Tax: {_money(tax)}",
+            f"Discount: {_money(discount)}",
+            "",
+            f"Total Amount: {_money(total)}",
+            "",
+            f"Payment Method: {payment_method or ''}",
+            f"Payment Status: {payment_status or ''} ({str(bill_date)[:10]})",
+        ]
+
+    lines += ["", "Thank you for your business!", ""]
+    return "\n".join(lines)
+
+
+def render_batch(invoices, issued):
+    # Runs in a worker process: [(file name, invoice text), ...]
+    return [(f"invoice_{invoice[0]}.txt", render_invoice(invoice, issued)) for invoice in invoices]
+
+
+def _chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _DirectoryWriter:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, text):
+        with open(os.path.join(self.path, name), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def close(self):
+        pass
+
+
+class _ZipWriter:
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def write(self, name, text):
+        self.zip.writestr(name, text)
+
+    def close(self):
+        self.zip.close()
+
+
+def generate_invoices(repo, output, start=None, end=None, booking_ids=None,
+                      workers=None, chunk_size=CHUNK_SIZE, progress=None):
+    # Renders invoices for the selected bookings into `output`: a directory,
+    # or a single archive when the path ends in .zip. Rendering is spread
+    # over `workers` processes (1 renders in this process); files are
+    # written here so a zip has a single writer.
+    stats = InvoiceStats()
+    issued = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    writer = _ZipWriter(output) if output.endswith('.zip') else _DirectoryWriter(output)
+    chunks = _chunks(group_invoices(repo.invoice_lines(start, end, booking_ids)), chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    def write(batch):
+        for name, text in batch:
+            writer.write(name, text)
+        stats.rendered += len(batch)
+        if progress:
+            stats.elapsed = time.perf_counter() - stats.started
+            progress(stats)
+
+    try:
+        if workers == 1:
+            for chunk in chunks:
+                write(render_batch(chunk, issued))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Keep a bounded number of chunks in flight so the query
+                # streams instead of being read up front
+                pending = []
+                for chunk in chunks:
+                    pending.append(pool.submit(render_batch, chunk, issued))
+                    if len(pending) >= workers * 2:
+                        write(pending.pop(0).result())
+                for future in pending:
+                    write(future.result())
+    finally:
+        writer.close()
+
+    stats.elapsed = time.perf_counter() - stats.started
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render invoices for a date range or list of bookings")
+    parser.add_argument('output', help="Output directory, or a .zip file")
+    parser.add_argument('--db', default='hotel.db', help="SQLite database (default: hotel.db)")
+    parser.add_argument('--from', dest='start', help="First check-out date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='end', help="Last check-out date (YYYY-MM-DD)")
+    parser.add_argument('--bookings', help="Comma-separated booking ids")
+    parser.add_argument('--workers', type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Invoices per worker task")
+    args = parser.parse_args(argv)
+
+    booking_ids = None
+    if args.bookings:
+        booking_ids = [int(booking_id) for booking_id in args.bookings.split(',') if booking_id.strip()]
+    if args.start is None and args.end is None and booking_ids is None:
+        parser.error("give a date range (--from/--to) or --bookings")
+
+    repo = HotelRepository.open(args.db)
+    try:
+        stats = generate_invoices(
+            repo,
+            args.output,
+            start=args.start,
+            end=args.end,
+            booking_ids=booking_ids,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            progress=lambda s: print(s, file=sys.stderr)
+        )
+    finally:
+        repo.close()
+
+    print(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,515 @@
+import argparse
+import re
+import time
+
+from analytics import AnalyticsRollup, add_rollup_columns
+from changes import TRACKED_TABLES
+from database import ConnectionManager, DatabaseConfig
+from money import to_cents
+
+
+# Versioned schema changes. PRAGMA user_version records the last migration
+# applied; each one runs in its own write transaction together with the
+# version bump, so an interrupted run picks up where it stopped. Append new
+# migrations to MIGRATIONS - never edit or reorder ones that have shipped.
+#
+# In WAL mode other terminals keep reading while an index is being built;
+# writers wait up to the busy timeout, so large indexes each get their own
+# short migration rather than one long lock.
+
+
+def _base_tables(cursor):
+    # Create rooms table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY,
+            room_number TEXT UNIQUE,
+            room_type TEXT,
+            rate REAL,
+            is_available INTEGER,
+            description TEXT,
+            last_updated TIMESTAMP
+        )
+    ''')
+
+    # Create bookings table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookings (
+            id INTEGER PRIMARY KEY,
+            room_number TEXT,
+            customer_name TEXT,
+            customer_phone TEXT,
+            check_in_date TEXT,
+            check_out_date TEXT,
+            total_amount REAL,
+            booking_date TIMESTAMP,
+            FOREIGN KEY (room_number) REFERENCES rooms (room_number)
+        )
+    ''')
+
+    # Create bills table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bills (
+            id INTEGER PRIMARY KEY,
+            booking_id INTEGER,
+            subtotal REAL,
+            tax_amount REAL,
+            discount_amount REAL,
+            total_amount REAL,
+            payment_status TEXT,
+            payment_method TEXT,
+            bill_date TIMESTAMP,
+            FOREIGN KEY (booking_id) REFERENCES bookings (id)
+        )
+    ''')
+
+    # Create services table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS services (
+            id INTEGER PRIMARY KEY,
+            service_name TEXT,
+            description TEXT,
+            price REAL,
+            category TEXT,
+            is_active INTEGER
+        )
+    ''')
+
+    # Create service_requests table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS service_requests (
+            id INTEGER PRIMARY KEY,
+            booking_id INTEGER,
+            service_id INTEGER,
+            quantity INTEGER,
+            total_amount REAL,
+            request_date TIMESTAMP,
+            status TEXT,
+            notes TEXT,
+            FOREIGN KEY (booking_id) REFERENCES bookings (id),
+            FOREIGN KEY (service_id) REFERENCES services (id)
+        )
+    ''')
+
+    # Create analytics table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analytics (
+            id INTEGER PRIMARY KEY,
+            date TEXT,
+            total_bookings INTEGER,
+            total_revenue REAL,
+            average_booking_value REAL,
+            occupancy_rate REAL,
+            room_type_distribution TEXT,
+            payment_method_distribution TEXT
+        )
+    ''')
+
+    # Create staff table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS staff (
+            id INTEGER PRIMARY KEY,
+            employee_id TEXT UNIQUE,
+            name TEXT,
+            position TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            join_date TEXT,
+            base_salary REAL,
+            status TEXT
+        )
+    ''')
+
+    # Create salary_payments table if not exists
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS salary_payments (
+            id INTEGER PRIMARY KEY,
+            employee_id TEXT,
+            payment_date TEXT,
+            base_salary REAL,
+            bonus REAL,
+            deductions REAL,
+            net_salary REAL,
+            payment_method TEXT,
+            remarks TEXT,
+            FOREIGN KEY (employee_id) REFERENCES staff (employee_id)
+        )
+    ''')
+
+
+def _booking_indexes(cursor):
+    # Stay lookups per room for availability checks
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_room_stay
+        ON bookings (room_number, check_in_date, check_out_date)
+    ''')
+
+    # Stays overlapping a date range, for occupancy
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_stay
+        ON bookings (check_out_date, check_in_date)
+    ''')
+
+    # Booking history is paged newest first by (booking_date, id)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_booking_date
+        ON bookings (booking_date)
+    ''')
+
+
+def _booking_search(cursor):
+    # Full-text index over guest name, phone and room for booking search,
+    # kept in sync with bookings by triggers
+    fts_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'bookings_fts'"
+    ).fetchone()
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS bookings_fts USING fts5 (
+            customer_name, customer_phone, room_number,
+            content = 'bookings', content_rowid = 'id', prefix = '2 3'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bookings_fts_insert AFTER INSERT ON bookings BEGIN
+            INSERT INTO bookings_fts (rowid, customer_name, customer_phone, room_number)
+            VALUES (new.id, new.customer_name, new.customer_phone, new.room_number);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bookings_fts_delete AFTER DELETE ON bookings BEGIN
+            INSERT INTO bookings_fts (bookings_fts, rowid, customer_name, customer_phone, room_number)
+            VALUES ('delete', old.id, old.customer_name, old.customer_phone, old.room_number);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bookings_fts_update
+        AFTER UPDATE OF customer_name, customer_phone, room_number ON bookings BEGIN
+            INSERT INTO bookings_fts (bookings_fts, rowid, customer_name, customer_phone, room_number)
+            VALUES ('delete', old.id, old.customer_name, old.customer_phone, old.room_number);
+            INSERT INTO bookings_fts (rowid, customer_name, customer_phone, room_number)
+            VALUES (new.id, new.customer_name, new.customer_phone, new.room_number);
+        END
+    ''')
+    if not fts_exists:
+        cursor.execute("INSERT INTO bookings_fts (bookings_fts) VALUES ('rebuild')")
+
+
+def _analytics_rollups(cursor):
+    # The backfill reads booking dates in their integer form, so it runs in
+    # migration 19 once they have been converted
+    add_rollup_columns(cursor)
+
+
+def _bill_indexes(cursor):
+    # Folio and unbilled-booking lookups join bills on booking_id
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bills_booking
+        ON bills (booking_id)
+    ''')
+
+    # Revenue reports and rollup rebuilds scan bills by date
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bills_bill_date
+        ON bills (bill_date)
+    ''')
+
+
+def _service_request_indexes(cursor):
+    # Service charges per booking, newest first
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_service_requests_booking
+        ON service_requests (booking_id, request_date)
+    ''')
+
+
+def _salary_payment_indexes(cursor):
+    # Salary history per employee
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_salary_payments_employee
+        ON salary_payments (employee_id, payment_date)
+    ''')
+
+
+# Amount columns stored as integer cents from migrations 8-15 on
+MONEY_COLUMNS = {
+    'rooms': ['rate'],
+    'bookings': ['total_amount'],
+    'bills': ['subtotal', 'tax_amount', 'discount_amount', 'total_amount'],
+    'services': ['price'],
+    'service_requests': ['total_amount'],
+    'staff': ['base_salary'],
+    'salary_payments': ['base_salary', 'bonus', 'deductions', 'net_salary'],
+    'analytics': ['total_revenue', 'average_booking_value', 'bills_total', 'bills_tax', 'bills_discount'],
+}
+
+
+def _rebuild_table(cursor, table, columns, convert):
+    # SQLite cannot change a column's type in place: create the new table,
+    # copy the rows (with `convert` applied to `columns`), swap it in and
+    # recreate the table's indexes and triggers. Row ids are kept. `convert`
+    # is one SQL template for every column or a {column: template} dict.
+    table_sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()[0]
+    dependents = [row[0] for row in cursor.execute('''
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL
+    ''', (table,))]
+    # Triggers on other tables that write to this one would fail the rename
+    # below, so they are dropped and recreated too
+    referencing = [(name, sql) for name, sql in cursor.execute('''
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name != ?
+    ''', (table,)).fetchall() if re.search(rf'\b{table}\b', sql)]
+    for name, sql in referencing:
+        cursor.execute(f'DROP TRIGGER {name}')
+        dependents.append(sql)
+
+    new_sql = re.sub(rf'^CREATE TABLE "?{table}"?', f'CREATE TABLE {table}_new', table_sql)
+    for column, declared in columns.items():
+        new_sql = re.sub(rf'\b{column}\s+\w+', f'{column} {declared}', new_sql, count=1)
+    cursor.execute(new_sql)
+
+    if isinstance(convert, str):
+        convert = dict.fromkeys(columns, convert)
+    names = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+    select = ', '.join(convert[name].format(name) if name in columns else name for name in names)
+    cursor.execute(f'INSERT INTO {table}_new ({", ".join(names)}) SELECT {select} FROM {table}')
+    cursor.execute(f'DROP TABLE {table}')
+    cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+    for sql in dependents:
+        cursor.execute(sql)
+
+
+def _money_as_cents(table):
+    # REAL amounts drift when summed over millions of rows; integer cents
+    # keep every SUM exact. Each table is rebuilt in its own migration, so
+    # the write lock is held for one table's copy at a time.
+    def apply(cursor):
+        columns = MONEY_COLUMNS[table]
+        declared = {row[1]: row[2] for row in cursor.execute(f'PRAGMA table_info({table})')}
+        if all(declared.get(column) == 'INTEGER' for column in columns):
+            return  # already in cents; converting again would scale by 100
+        _rebuild_table(
+            cursor, table, dict.fromkeys(columns, 'INTEGER'),
+            'CAST(ROUND({0} * 100) AS INTEGER)'
+        )
+    return apply
+
+
+def _change_log(cursor):
+    # Cross-terminal change feed, read through changes.ChangeFeed.
+    # AUTOINCREMENT keeps versions increasing even after old rows are pruned.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_change_log_changed_at
+        ON change_log (changed_at)
+    ''')
+    for table in TRACKED_TABLES:
+        for event, op, row in (('INSERT', 'insert', 'new'), ('UPDATE', 'update', 'new'), ('DELETE', 'delete', 'old')):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS {table}_change_{op} AFTER {event} ON {table} BEGIN
+                    INSERT INTO change_log (table_name, row_id, op)
+                    VALUES ('{table}', {row}.id, '{op}');
+                END
+            ''')
+
+
+def _default_services(cursor):
+    # Seed the service catalog of a new hotel. This used to run on every
+    # startup; as a migration it is checked once per database.
+    cursor.execute('SELECT COUNT(*) FROM services')
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany('''
+            INSERT INTO services (service_name, description, price, category, is_active)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [
+            ('Room Service', 'Daily room cleaning and maintenance', to_cents('25.00'), 'Cleaning', 1),
+            ('Laundry Service', 'Wash, dry, and fold service', to_cents('15.00'), 'Laundry', 1),
+            ('Mini Bar Refill', 'Refill of room mini bar items', to_cents('50.00'), 'Food', 1),
+            ('Food Delivery', 'Delivery of food and snacks to room', to_cents('10.00'), 'Food', 1),
+            ('Extra Towels', 'Additional towels and linens', to_cents('5.00'), 'Cleaning', 1),
+            ('Late Checkout', 'Extended stay beyond standard checkout time', to_cents('30.00'), 'Other', 1)
+        ])
+
+
+def _unbilled_bookings(cursor):
+    # The billing screen lists bookings that have no bill. As an anti-join
+    # that reads every booking ever made; a flag kept current by triggers on
+    # bills, with a partial index over the unbilled ones, makes it
+    # proportional to the list instead.
+    cursor.execute('ALTER TABLE bookings ADD COLUMN billed INTEGER NOT NULL DEFAULT 0')
+    # The backfill is not a change other terminals need to see
+    last_version = cursor.execute('SELECT COALESCE(MAX(version), 0) FROM change_log').fetchone()[0]
+    cursor.execute('UPDATE bookings SET billed = 1 WHERE id IN (SELECT booking_id FROM bills)')
+    cursor.execute('DELETE FROM change_log WHERE version > ?', (last_version,))
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_unbilled
+        ON bookings (booking_date) WHERE billed = 0
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bills_billed_insert AFTER INSERT ON bills BEGIN
+            UPDATE bookings SET billed = 1 WHERE id = new.booking_id AND billed = 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bills_billed_delete AFTER DELETE ON bills BEGIN
+            UPDATE bookings
+            SET billed = EXISTS (SELECT 1 FROM bills WHERE booking_id = old.booking_id)
+            WHERE id = old.booking_id;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS bills_billed_update AFTER UPDATE OF booking_id ON bills BEGIN
+            UPDATE bookings
+            SET billed = EXISTS (SELECT 1 FROM bills WHERE booking_id = old.booking_id)
+            WHERE id = old.booking_id;
+            UPDATE bookings SET billed = 1 WHERE id = new.booking_id;
+        END
+    ''')
+
+
+# Text dates to integers (see dates.py); unparseable values become NULL
+DAY_SQL = "CAST(strftime('%s', date({0})) AS INTEGER) / 86400"
+EPOCH_SQL = "CAST(strftime('%s', {0}) AS INTEGER)"
+
+
+def _dates_as_integers(cursor):
+    # Stay dates as day numbers and booking times as epoch seconds: every
+    # date-range filter compares integers with half-open bounds instead of
+    # text, and idx_bookings_stay now covers the availability and occupancy
+    # scans (room_number included), so they never touch the table
+    cursor.execute('DROP INDEX IF EXISTS idx_bookings_stay')
+    _rebuild_table(
+        cursor, 'bookings',
+        dict.fromkeys(('check_in_date', 'check_out_date', 'booking_date'), 'INTEGER'),
+        {'check_in_date': DAY_SQL, 'check_out_date': DAY_SQL, 'booking_date': EPOCH_SQL}
+    )
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_bookings_stay
+        ON bookings (check_out_date, check_in_date, room_number)
+    ''')
+    # Rollups are keyed by the day each booking was made, now read from the
+    # integer form (this is also the backfill deferred from migration 4)
+    AnalyticsRollup(cursor.connection).rebuild()
+
+
+def _service_history_index(cursor):
+    # Service history lists every request newest first; walking this index
+    # backwards returns them in order, with bookings and services looked up
+    # by primary key, instead of scanning and sorting the whole history
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_service_requests_date
+        ON service_requests (request_date)
+    ''')
+
+
+MIGRATIONS = [
+    (1, "Base tables", _base_tables),
+    (2, "Booking stay and history indexes", _booking_indexes),
+    (3, "Booking full-text search", _booking_search),
+    (4, "Daily analytics rollups", _analytics_rollups),
+    (5, "Bill indexes", _bill_indexes),
+    (6, "Service request index", _service_request_indexes),
+    (7, "Salary payment index", _salary_payment_indexes),
+    (8, "Room rates stored as integer cents", _money_as_cents('rooms')),
+    (9, "Booking amounts stored as integer cents", _money_as_cents('bookings')),
+    (10, "Bill amounts stored as integer cents", _money_as_cents('bills')),
+    (11, "Service prices stored as integer cents", _money_as_cents('services')),
+    (12, "Service request amounts stored as integer cents", _money_as_cents('service_requests')),
+    (13, "Staff salaries stored as integer cents", _money_as_cents('staff')),
+    (14, "Salary payments stored as integer cents", _money_as_cents('salary_payments')),
+    (15, "Analytics totals stored as integer cents", _money_as_cents('analytics')),
+    (16, "Change log for cross-terminal refresh", _change_log),
+    (17, "Default services", _default_services),
+    (18, "Unbilled bookings index", _unbilled_bookings),
+    (19, "Stay and booking dates stored as integers", _dates_as_integers),
+    (20, "Service history index", _service_history_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn, target=None, progress=None):
+    # Applies pending migrations up to `target` (default: all) and returns the
+    # versions applied; progress(version, description, seconds) is called
+    # after each one
+    applied = []
+    if schema_version(conn) >= (LATEST_VERSION if target is None else target):
+        return applied  # the usual startup: one PRAGMA, nothing to do
+    for version, description, apply in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        if schema_version(conn) >= version:
+            continue
+
+        started = time.perf_counter()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another terminal may have migrated while we waited for the lock
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn.cursor())
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+        if progress is not None:
+            progress(version, description, time.perf_counter() - started)
+
+    if applied:
+        # Planner statistics for the new indexes; analysis_limit samples each
+        # index instead of reading all of it, so this stays fast on large files
+        conn.execute('PRAGMA analysis_limit = 1000')
+        conn.execute('ANALYZE')
+        conn.commit()
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument('--db', default=None, help="SQLite database (default: $HMS_DB or hotel.db)")
+    parser.add_argument('--target', type=int, default=None, help="Stop after this version")
+    parser.add_argument('--status', action='store_true', help="Show the schema version and pending migrations")
+    args = parser.parse_args(argv)
+
+    manager = ConnectionManager(DatabaseConfig.from_env(args.db))
+    conn = manager.writer()
+    try:
+        version = schema_version(conn)
+        if args.status:
+            print(f"Schema version {version} (latest {LATEST_VERSION})")
+            for number, description, _ in MIGRATIONS:
+                if number > version:
+                    print(f"  pending {number}: {description}")
+            return 0
+
+        def report(number, description, seconds):
+            print(f"Applied {number}: {description} ({seconds:.2f}s)")
+
+        applied = migrate(conn, args.target, report)
+        if not applied:
+            print(f"Schema is up to date (version {version})")
+        return 0
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,34 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Amounts are stored as integer cents and handled as Decimal in Python, so
+# SUMs in SQLite are exact integer sums and nothing is re-parsed from text
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+def to_decimal(value):
+    # Decimal rounded to cents from Decimal, int, float or text ('$1,250.50')
+    if value is None or value == "":
+        return ZERO
+    if isinstance(value, str):
+        value = value.strip().replace("$", "").replace(",", "")
+    try:
+        return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+
+
+def to_cents(value):
+    # Storage form: integer cents
+    return int(to_decimal(value) * 100)
+
+
+def from_cents(cents):
+    # Stored integer cents back to Decimal; NULL stays None
+    if cents is None:
+        return None
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_money(value):
+    return f"${to_decimal(value):.2f}"
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from dates import to_day
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    # NumPy is optional (the pure Python path gives the same results) and
+    # slow to import, so it is loaded on the first occupancy query rather
+    # than when the application starts
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+# Room-night occupancy: every stay [check_in, check_out) contributes one
+# occupied room for each night it covers. Stays are clipped to the horizon
+# in SQL and expanded with a difference array, so the cost is one pass over
+# the overlapping stays plus one pass over the days.
+class OccupancyEngine:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def room_count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+
+    def occupied_nights(self, start, end):
+        # Occupied rooms for each night in [start, end)
+        start, end = _as_date(start), _as_date(end)
+        days = (end - start).days
+        if days <= 0:
+            return []
+
+        # Offsets of each overlapping stay relative to `start`, clipped to
+        # [0, days]; day numbers, so a range scan of idx_bookings_stay (which
+        # covers both columns) and integer subtraction
+        rows = self.conn.execute('''
+            SELECT MAX(check_in_date - :start, 0), MIN(check_out_date - :start, :days)
+            FROM bookings
+            WHERE check_out_date > :start AND check_in_date < :end
+        ''', {'start': to_day(start), 'end': to_day(end), 'days': days}).fetchall()
+        rows = [row for row in rows if row[0] < row[1]]
+
+        np = _numpy()
+        if np is not None:
+            if not rows:
+                return [0] * days
+            stays = np.array(rows, dtype=np.int64)
+            diff = np.bincount(stays[:, 0], minlength=days + 1) - np.bincount(stays[:, 1], minlength=days + 1)
+            return np.cumsum(diff[:days]).tolist()
+
+        diff = [0] * (days + 1)
+        for check_in, check_out in rows:
+            diff[check_in] += 1
+            diff[check_out] -= 1
+        return list(accumulate(diff[:days]))
+
+    def daily(self, start, end):
+        # [(day, occupied rooms, occupancy %)] for each night in [start, end)
+        start = _as_date(start)
+        room_count = self.room_count()
+        return [
+            (start + timedelta(days=i), occupied, occupied * 100.0 / room_count if room_count else 0.0)
+            for i, occupied in enumerate(self.occupied_nights(start, end))
+        ]
+
+    def by_period(self, start, end, period='month'):
+        # [(label, occupied room-nights, available room-nights, occupancy %)]
+        # grouped by 'day', 'week' (ISO weeks) or 'month'
+        start = _as_date(start)
+        room_count = self.room_count()
+        groups = {}
+        for i, occupied in enumerate(self.occupied_nights(start, end)):
+            day = start + timedelta(days=i)
+            if period == 'month':
+                label = day.strftime('%Y-%m')
+            elif period == 'week':
+                year, week, _ = day.isocalendar()
+                label = f"{year}-W{week:02d}"
+            else:
+                label = day.isoformat()
+            nights = groups.setdefault(label, [0, 0])
+            nights[0] += occupied
+            nights[1] += room_count
+        return [
+            (label, occupied, available, occupied * 100.0 / available if available else 0.0)
+            for label, (occupied, available) in groups.items()
+        ]
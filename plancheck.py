@@ -0,0 +1,219 @@
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+from benchmark import operations
+from database import DatabaseConfig
+from datagen import generate
+from querylog import explain_plan, normalize
+from repository import HotelRepository
+
+# Tables that grow with every stay; a plain SCAN of one of these is a full
+# table scan. rooms, services and staff are bounded by the size of the hotel.
+LARGE_TABLES = {'bookings', 'bills', 'service_requests', 'salary_payments', 'change_log'}
+STEP_INTERVAL = 100  # progress handler granularity (VM instructions)
+# Allowed VM steps per statement: BASE_STEPS plus STEPS_PER_ROW for each row
+# returned. Index lookups cost tens of steps per row; a scan that reads many
+# rows to return a few blows through this.
+BASE_STEPS = 20000
+STEPS_PER_ROW = 100
+SQL_KEYWORDS = {'where', 'left', 'inner', 'join', 'on', 'order', 'group', 'limit', 'using', 'cross', 'natural'}
+
+
+def hot_operations(repo):
+    # Everything the screens run: the benchmarked queries plus the lookups
+    # behind dialogs, billing, payroll and cross-terminal refresh
+    today = date.today()
+    bookings, rooms, staff = repo.booking_page(limit=1), repo.list_rooms(), repo.list_staff()
+    if not (bookings and rooms and staff):
+        raise ValueError("the database needs at least one room, booking and employee")
+    booking, room, employee = bookings[0], rooms[0], staff[0]
+    ops = operations(repo)
+    ops.update({
+        'load_rooms (occupied)': repo.occupied_rooms,
+        'show_update_room': lambda: (repo.get_room(room.room_number),
+                                     repo.get_room_description(room.room_number)),
+        'room_is_free': lambda: repo.room_is_free(room.room_number, today, today + timedelta(days=2)),
+        'refresh_availability': repo.refresh_availability,
+        'calculate_bill': lambda: repo.folio(booking.id),
+        'generate_invoices': lambda: list(repo.invoice_lines(today - timedelta(days=30), today)),
+        'generate_invoices (ids)': lambda: list(repo.invoice_lines(booking_ids=[booking.id])),
+        'load_staff_data': repo.list_staff,
+        'show_salary_history': lambda: repo.list_salary_payments(employee.employee_id),
+        'load_available_services': repo.list_available_services,
+        'load_all_services': repo.list_all_services,
+        'get_service_id': lambda: repo.get_service_id('Room Service'),
+        'poll_changes': lambda: (repo.change_version(), repo.changes_since(repo.change_version())),
+    })
+    return ops
+
+
+def write_operations(repo):
+    # Writes are checked on generated databases only
+    booking = repo.booking_page(limit=1)[0]
+    unbilled = repo.list_unbilled_bookings()[0]
+    room = repo.list_rooms()[0]
+    start = date.today() + timedelta(days=400)
+    service_id = repo.get_service_id('Room Service')
+    return {
+        'book_room': lambda: repo.book_room(room.room_number, 'Plan Check', '900000000',
+                                            start, start + timedelta(days=1)),
+        'update_room': lambda: repo.update_room(room.room_number, room.room_type, room.rate,
+                                                room.description),
+        'process_payment': lambda: repo.bill_folio(repo.folio(unbilled.id), 'Cash'),
+        'request_service': lambda: repo.create_service_request(booking.id, service_id, 1, 25),
+        'set_service_active': lambda: repo.set_service_active(service_id, 1),
+    }
+
+
+# Collects each distinct statement (with the parameters of its first run)
+# from an instrumented connection; stands in for querylog.QueryLog
+class StatementCapture:
+    def __init__(self):
+        self.statements = {}
+        self.operation = None
+
+    def record(self, conn, sql, params, seconds, rows, site):
+        key = normalize(sql)
+        if key not in self.statements:
+            self.statements[key] = (self.operation, sql, params)
+
+
+class PlanProblem:
+    def __init__(self, operation, sql, reason, plan):
+        self.operation = operation
+        self.sql = sql
+        self.reason = reason
+        self.plan = plan
+
+    def __str__(self):
+        lines = [f"{self.operation}: {self.reason}", f"  {normalize(self.sql)[:160]}"]
+        lines.extend(f"    {line}" for line in self.plan)
+        return '\n'.join(lines)
+
+
+def table_aliases(sql):
+    # {'b': 'bookings', 'bookings': 'bookings', ...} from FROM/JOIN clauses
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.lower() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def full_scans(sql, plan):
+    # Large tables read start to finish without an index
+    aliases = table_aliases(sql)
+    scanned = []
+    for line in plan:
+        match = re.match(r'\s*SCAN (\w+)(.*)', line)
+        if match and 'INDEX' not in match.group(2) and aliases.get(match.group(1)) in LARGE_TABLES:
+            scanned.append(aliases[match.group(1)])
+    return scanned
+
+
+def count_steps(conn, sql, params):
+    # (VM steps, rows) for running the statement to completion
+    steps = [0]
+
+    def tick():
+        steps[0] += STEP_INTERVAL
+        return 0
+
+    conn.set_progress_handler(tick, STEP_INTERVAL)
+    try:
+        rows = len(sqlite3.Cursor(conn).execute(sql, params or ()).fetchall())
+    finally:
+        conn.set_progress_handler(None, 0)
+    return steps[0], rows
+
+
+def check_statements(path, statements, verbose=False):
+    # Plans and step counts on a read-only connection, so nothing is changed
+    conn = sqlite3.connect(Path(path).absolute().as_uri() + '?mode=ro', uri=True)
+    problems = []
+    try:
+        for operation, sql, params in statements:
+            if params is None:
+                continue  # executemany: bulk inserts
+            plan = explain_plan(conn, sql, params)
+            scanned = full_scans(sql, plan)
+            if scanned:
+                problems.append(PlanProblem(operation, sql, f"full scan of {', '.join(scanned)}", plan))
+
+            steps, rows, budget = None, None, None
+            if re.match(r'\s*(SELECT|WITH)\b', sql, re.IGNORECASE):
+                steps, rows = count_steps(conn, sql, params)
+                budget = BASE_STEPS + STEPS_PER_ROW * rows
+                if steps > budget:
+                    problems.append(PlanProblem(
+                        operation, sql, f"{steps} VM steps for {rows} rows (budget {budget})", plan))
+            if verbose:
+                cost = f"{steps:>9} steps {rows:>7} rows" if steps is not None else f"{'write':>29}"
+                print(f"{operation:<28} {cost}  {normalize(sql)[:70]}")
+    finally:
+        conn.close()
+    return problems
+
+
+def capture_statements(path, include_writes):
+    # Runs every operation once on instrumented connections and returns
+    # [(operation, sql, params)] for each distinct statement
+    capture = StatementCapture()
+    config = DatabaseConfig.from_env(path)
+    config.slow_query_ms = float('inf')
+    config.query_log = None
+    repo = HotelRepository.open(config=config)
+    try:
+        ops = hot_operations(repo)
+        if include_writes:
+            ops.update(write_operations(repo))
+        repo.conn.query_log = repo.read_conn.query_log = capture
+        for name, operation in ops.items():
+            capture.operation = name
+            operation()
+    finally:
+        repo.close()
+    return list(capture.statements.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that every hot query uses an index and stays within its step budget")
+    parser.add_argument('--db', help="Check this database instead of a generated one (only reads are run)")
+    parser.add_argument('--rooms', type=int, default=500, help="Rooms in the generated hotel (default: 500)")
+    parser.add_argument('--years', type=int, default=3, help="Years of history to generate (default: 3)")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the generated data")
+    parser.add_argument('--verbose', '-v', action='store_true', help="Print every statement with its cost")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            path = os.path.join(tmp, 'plancheck.db')
+            repo = HotelRepository.open(path)
+            try:
+                print(generate(repo.conn, args.rooms, args.years, args.seed), file=sys.stderr)
+            finally:
+                repo.close()
+
+        try:
+            statements = capture_statements(path, include_writes=args.db is None)
+        except ValueError as e:
+            parser.error(f"{path}: {e}")
+        problems = check_statements(path, statements, args.verbose)
+
+    for problem in problems:
+        print(problem)
+    print(f"{len(statements)} statements checked, {len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
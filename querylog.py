@@ -0,0 +1,311 @@
+import argparse
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+SLOW_LOG = 'slow_queries.log'
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+
+
+def normalize(sql):
+    return ' '.join(sql.split())
+
+
+def call_site():
+    # 'repository.py:341 list_unbilled_bookings <- hms.py:852 load_unbilled_bookings':
+    # the first two frames outside this module and the private query helpers
+    sites = []
+    frame = sys._getframe(2)
+    while frame is not None and len(sites) < 2:
+        code = frame.f_code
+        if os.path.normcase(os.path.abspath(code.co_filename)) != _THIS_FILE and not code.co_name.startswith('_'):
+            sites.append(f'{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}')
+        frame = frame.f_back
+    return ' <- '.join(sites)
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.sites = Counter()
+
+    def add(self, ms, rows, site):
+        self.calls += 1
+        self.rows += rows
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        bucket = 0
+        while bucket < len(BUCKETS_MS) and ms > BUCKETS_MS[bucket]:
+            bucket += 1
+        self.histogram[bucket] += 1
+        self.sites[site] += 1
+
+    def percentile_ms(self, fraction):
+        # Upper bound of the bucket holding the given fraction of calls
+        wanted = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS + (self.max_ms,), self.histogram):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self):
+        return {
+            'sql': self.sql,
+            'calls': self.calls,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            'p50_ms': round(self.percentile_ms(0.50), 3),
+            'p99_ms': round(self.percentile_ms(0.99), 3),
+            'max_ms': round(self.max_ms, 3),
+            'histogram': dict(zip([f'<={b}ms' for b in BUCKETS_MS] + ['more'], self.histogram)),
+            'sites': dict(self.sites.most_common(5)),
+        }
+
+
+# Per-statement latency histograms, row counts and call sites for every
+# statement run on an instrumented connection, plus a log (JSON lines) of
+# each execution slower than `slow_ms`. With `explain` on, the first slow
+# run of each statement also records its EXPLAIN QUERY PLAN.
+class QueryLog:
+    def __init__(self, slow_ms=100, path=SLOW_LOG, explain=False):
+        self.slow_ms = slow_ms
+        self.path = path
+        self.explain = explain
+        self.statements = {}
+        self._explained = set()
+        self._lock = threading.Lock()
+
+    def record(self, conn, sql, params, seconds, rows, site):
+        ms = seconds * 1000
+        key = normalize(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+            stats.add(ms, rows, site)
+        if ms >= self.slow_ms:
+            self.log_slow(conn, key, params, ms, rows, site)
+
+    def log_slow(self, conn, sql, params, ms, rows, site):
+        entry = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'ms': round(ms, 3),
+            'rows': rows,
+            'site': site,
+            'sql': sql,
+        }
+        if self.explain and sql not in self._explained and params is not None:
+            self._explained.add(sql)
+            entry['plan'] = explain_plan(conn, sql, params)
+        self._write(entry)
+
+    def _write(self, entry):
+        if not self.path:
+            return
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def summary(self):
+        with self._lock:
+            stats = [s.as_dict() for s in self.statements.values()]
+        return sorted(stats, key=lambda s: s['total_ms'], reverse=True)
+
+    def write_summary(self):
+        # Appended to the log when the process exits
+        if self.statements:
+            self._write({'at': datetime.now().isoformat(timespec='seconds'), 'summary': self.summary()})
+
+
+def explain_plan(conn, sql, params=()):
+    # EXPLAIN QUERY PLAN as indented lines ('SCAN bookings', '  SEARCH bills ...')
+    try:
+        # A plain cursor, so the EXPLAIN itself is not recorded
+        rows = sqlite3.Cursor(conn).execute('EXPLAIN QUERY PLAN ' + sql, params or ()).fetchall()
+    except sqlite3.Error as e:
+        return [f'(no plan: {e})']
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # A statement's time covers execute() and every fetch until the cursor
+    # is exhausted, re-executed, closed or dropped
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        site = call_site()
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        self._pending = [sql, parameters, time.perf_counter() - started, 0, site]
+        if self.description is None:
+            self._pending[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        site = call_site()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        # No single parameter set to explain with: params None
+        self._pending = [sql, None, time.perf_counter() - started, max(self.rowcount, 0), site]
+        self._finish()
+        return self
+
+    def _fetched(self, started, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - started
+            pending[3] += rows
+            if done:
+                self._finish()
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        size = self.arraysize if size is None else size
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None and self.connection.query_log is not None:
+            sql, params, seconds, rows, site = pending
+            self.connection.query_log.record(self.connection, sql, params, seconds, rows, site)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3.connect(..., factory=InstrumentedConnection): every statement,
+    # whether run through a cursor or the connection shortcuts, is timed
+    query_log = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_log(slow_ms, path=SLOW_LOG, explain=False):
+    # One QueryLog per log file for the whole process (the GUI, its worker
+    # thread and the API server's pool all feed the same statistics)
+    with _shared_lock:
+        log = _shared.get(path)
+        if log is None:
+            log = _shared[path] = QueryLog(slow_ms, path, explain)
+            atexit.register(log.write_summary)
+        return log
+
+
+def read_log(path):
+    slow, summary = [], None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                if 'summary' in entry:
+                    summary = entry
+                else:
+                    slow.append(entry)
+    return slow, summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a slow-query log")
+    parser.add_argument('path', nargs='?', default=SLOW_LOG, help=f"Log file (default: {SLOW_LOG})")
+    parser.add_argument('--top', type=int, default=10, help="Statements to show (default: 10)")
+    args = parser.parse_args(argv)
+
+    slow, summary = read_log(args.path)
+    grouped = {}
+    for entry in slow:
+        stats = grouped.setdefault(entry['sql'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                  'sites': Counter(), 'plan': None})
+        stats['count'] += 1
+        stats['total_ms'] += entry['ms']
+        stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+        stats['sites'][entry['site']] += 1
+        stats['plan'] = stats['plan'] or entry.get('plan')
+
+    print(f"{len(slow)} slow executions of {len(grouped)} statements")
+    ranked = sorted(grouped.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+    for sql, stats in ranked[:args.top]:
+        print(f"\n{stats['count']} x, {stats['total_ms']:.0f} ms total, {stats['max_ms']:.0f} ms max")
+        print(f"  {sql[:200]}")
+        for site, count in stats['sites'].most_common(3):
+            print(f"  from {site} ({count})")
+        for line in stats['plan'] or []:
+            print(f"    {line}")
+
+    if summary:
+        print(f"\nAll statements at {summary['at']} (by total time):")
+        for stats in summary['summary'][:args.top]:
+            print(f"  {stats['calls']:>7} calls {stats['total_ms']:>10.1f} ms  p50 <= {stats['p50_ms']:g} ms"
+                  f"  p99 <= {stats['p99_ms']:g} ms  {stats['rows']:>9} rows  {stats['sql'][:80]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
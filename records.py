@@ -0,0 +1,80 @@
+from collections import namedtuple
+from functools import lru_cache
+
+from dates import from_day, from_epoch
+from money import from_cents
+
+# Typed rows for the tables read a whole row at a time (bills and service
+# requests are only read through joins and totals, see folio() and
+# invoice_lines()). They are namedtuples (no per-row __dict__), so a
+# million bookings cost about as much as plain tuples, and fields are read
+# by name instead of by position. Queries list the columns explicitly via
+# columns(), so adding a column to a table can't shift existing fields.
+
+
+class Room(namedtuple('Room', 'id room_number room_type rate is_available description last_updated')):
+    __slots__ = ()
+    TABLE = 'rooms'
+    MONEY = ('rate',)
+    ROOM_TYPES = [
+        ('SINGLE', 'Single Room'),
+        ('DOUBLE', 'Double Room'),
+        ('DELUXE', 'Deluxe Room'),
+        ('SUITE', 'Suite')
+    ]
+
+
+class Booking(namedtuple('Booking', 'id room_number customer_name customer_phone check_in_date '
+                                    'check_out_date total_amount booking_date')):
+    __slots__ = ()
+    TABLE = 'bookings'
+    MONEY = ('total_amount',)
+    DAYS = ('check_in_date', 'check_out_date')
+    TIMESTAMPS = ('booking_date',)
+
+
+class Service(namedtuple('Service', 'id service_name description price category is_active')):
+    __slots__ = ()
+    TABLE = 'services'
+    MONEY = ('price',)
+
+
+class Staff(namedtuple('Staff', 'id employee_id name position phone email address join_date '
+                                'base_salary status')):
+    __slots__ = ()
+    TABLE = 'staff'
+    MONEY = ('base_salary',)
+
+
+class SalaryPayment(namedtuple('SalaryPayment', 'id employee_id payment_date base_salary bonus '
+                                                'deductions net_salary payment_method remarks')):
+    __slots__ = ()
+    TABLE = 'salary_payments'
+    MONEY = ('base_salary', 'bonus', 'deductions', 'net_salary')
+
+
+def columns(record, alias=None):
+    # Explicit select list for a record: 'b.id, b.room_number, ...'
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(prefix + field for field in record._fields)
+
+
+@lru_cache(maxsize=None)
+def row_factory(record):
+    # sqlite3 row factory building `record`s, with cent columns as Decimal,
+    # day-number columns as date and epoch-second columns as datetime
+    fields = record._fields
+    converters = (
+        [(fields.index(field), from_cents) for field in record.MONEY]
+        + [(fields.index(field), from_day) for field in getattr(record, 'DAYS', ())]
+        + [(fields.index(field), from_epoch) for field in getattr(record, 'TIMESTAMPS', ())]
+    )
+    make = record._make
+
+    def factory(cursor, row):
+        if converters:
+            row = list(row)
+            for index, convert in converters:
+                row[index] = convert(row[index])
+        return make(row)
+    return factory
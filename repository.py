@@ -0,0 +1,635 @@
+import json
+import re
+from datetime import datetime, date, timedelta
+
+from analytics import AnalyticsRollup
+from availability import AvailabilityIndex
+from changes import ChangeFeed
+from database import ConnectionManager, DatabaseConfig
+from dates import from_day, to_day, to_epoch
+from folio import Folio
+from migrations import migrate
+from money import from_cents, to_cents
+from occupancy import OccupancyEngine
+from records import Booking, Room, SalaryPayment, Service, Staff, columns, row_factory
+
+
+# Schema shared by the GUI and headless jobs
+def init_schema(conn):
+    # Bring the schema up to date (see migrations.py); on a current database
+    # this is a single PRAGMA user_version read
+    migrate(conn)
+
+
+def fts_query(term):
+    # Every word the user typed must match as a prefix: 'pra sin' -> "pra"* "sin"*
+    words = re.findall(r'\w+', term or '')
+    return ' '.join('"' + word + '"*' for word in words) or None
+
+
+class ConflictError(ValueError):
+    # A write that clashes with what is already stored rather than bad
+    # input; callers that care (the API) report it as a conflict
+    pass
+
+
+class AlreadyBilledError(ConflictError):
+    pass
+
+
+class RoomBookedError(ConflictError):
+    pass
+
+
+def parse_date(value):
+    # Accept date objects or YYYY-MM-DD strings
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format. Please use YYYY-MM-DD")
+
+
+def _with_money(row, columns):
+    # Integer-cent columns at these positions as Decimal
+    row = list(row)
+    for column in columns:
+        row[column] = from_cents(row[column])
+    return tuple(row)
+
+
+def _with_days(row, columns):
+    # Day-number columns at these positions as date
+    row = list(row)
+    for column in columns:
+        row[column] = from_day(row[column])
+    return tuple(row)
+
+
+def _months_ago(months, today=None):
+    today = today or date.today()
+    month = today.month - months
+    year = today.year + (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return date(year, month, 1)
+
+
+# Data access layer used by the GUI, batch jobs and load tests
+class HotelRepository:
+    # Writes go through `conn`; plain reads through `read_conn` (a read-only
+    # connection in WAL mode, so they never wait on another terminal's write)
+    def __init__(self, conn, read_conn=None):
+        self.conn = conn
+        self.read_conn = read_conn or conn
+        self.manager = None
+        self.analytics = AnalyticsRollup(conn, self.read_conn)
+        self.occupancy = OccupancyEngine(self.read_conn)
+        self.changes = ChangeFeed(self.read_conn)
+        self._availability = None
+        self._availability_since = None
+
+    @classmethod
+    def open(cls, path=None, config=None):
+        manager = ConnectionManager(config or DatabaseConfig.from_env(path))
+        init_schema(manager.writer())
+        repo = cls(manager.writer(), manager.reader())
+        repo.manager = manager
+        return repo
+
+    def close(self):
+        if self.manager is not None:
+            self.manager.close()
+        else:
+            self.conn.close()
+
+    # `money` lists the positions of amount columns to return as Decimal
+    def _query(self, sql, params=(), money=()):
+        rows = self.read_conn.execute(sql, params).fetchall()
+        if money:
+            rows = [_with_money(row, money) for row in rows]
+        return rows
+
+    def _query_one(self, sql, params=(), money=()):
+        row = self.read_conn.execute(sql, params).fetchone()
+        if row is not None and money:
+            row = _with_money(row, money)
+        return row
+
+    def _records(self, record, sql, params=()):
+        cursor = self.read_conn.cursor()
+        cursor.row_factory = row_factory(record)
+        return cursor.execute(sql, params).fetchall()
+
+    def _record(self, record, sql, params=()):
+        cursor = self.read_conn.cursor()
+        cursor.row_factory = row_factory(record)
+        return cursor.execute(sql, params).fetchone()
+
+    def _execute(self, sql, params=()):
+        cursor = self.conn.execute(sql, params)
+        self.conn.commit()
+        return cursor
+
+    # Rooms
+    def list_rooms(self):
+        return self._records(Room, f"SELECT {columns(Room)} FROM rooms")
+
+    def get_room(self, room_number):
+        return self._record(Room, f"SELECT {columns(Room)} FROM rooms WHERE room_number = ?", (room_number,))
+
+    def get_room_description(self, room_number):
+        row = self._query_one("SELECT description FROM rooms WHERE room_number = ?", (room_number,))
+        return row[0] if row else None
+
+    def add_room(self, room_number, room_type, rate, description=""):
+        self._execute('''
+            INSERT INTO rooms (room_number, room_type, rate, is_available, description, last_updated)
+            VALUES (?, ?, ?, 1, ?, ?)
+        ''', (room_number, room_type, to_cents(rate), description, datetime.now()))
+        if self._availability is not None:
+            self._availability.add_room(room_number)
+
+    def update_room(self, room_number, room_type, rate, description):
+        self._execute('''
+            UPDATE rooms
+            SET room_type = ?, rate = ?, description = ?, last_updated = ?
+            WHERE room_number = ?
+        ''', (room_type, to_cents(rate), description, datetime.now(), room_number))
+
+    def remove_room(self, room_number):
+        self._execute("DELETE FROM rooms WHERE room_number = ?", (room_number,))
+        if self._availability is not None:
+            self._availability.remove_room(room_number)
+
+    # Availability
+    @property
+    def availability(self):
+        if self._availability is None:
+            self._availability = AvailabilityIndex.from_connection(self.read_conn, self._availability_since)
+        return self._availability
+
+    def refresh_availability(self, since=None):
+        # Rebuilt on next use, from stays ending on or after `since` (default
+        # the day it is built; the benchmark passes its data's "today")
+        self._availability = None
+        self._availability_since = since
+
+    def _apply_availability_changes(self, changes):
+        # Keep the cached index in step with writes from other terminals
+        index = self._availability
+        booking_changes = changes.get('bookings', {})
+        room_changes = changes.get('rooms', {})
+        if index is None or not (booking_changes or room_changes):
+            return
+        if 'delete' in booking_changes.values() or 'delete' in room_changes.values():
+            # The deleted row (and so its room) is gone; rebuild on next use
+            self._availability = None
+            return
+
+        rooms = set()
+        for table, changed in (('bookings', booking_changes), ('rooms', room_changes)):
+            ids = list(changed)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self._query(
+                    f"SELECT room_number FROM {table} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                rooms.update(row[0] for row in rows)
+        for room_number in rooms:
+            index.reload_room(self.read_conn, room_number)
+
+    def room_is_free(self, room_number, check_in, check_out, conn=None):
+        # Authoritative check against the database, served by
+        # idx_bookings_room_stay; book_room passes the writer connection so
+        # the check runs inside its write transaction
+        row = (conn or self.read_conn).execute('''
+            SELECT 1 FROM bookings
+            WHERE room_number = ? AND check_in_date < ? AND check_out_date > ?
+            LIMIT 1
+        ''', (str(room_number), to_day(parse_date(check_out)), to_day(parse_date(check_in)))).fetchone()
+        return row is None
+
+    def free_rooms(self, check_in, check_out):
+        return self.availability.free_rooms(parse_date(check_in), parse_date(check_out))
+
+    def occupied_rooms(self, day=None):
+        day = day or date.today()
+        index = self.availability
+        return {
+            room_number for room_number in index.rooms
+            if not index.is_free(room_number, day, day + timedelta(days=1))
+        }
+
+    # Bookings
+    def list_bookings(self):
+        return self._records(Booking, f'''
+            SELECT {columns(Booking)} FROM bookings
+            ORDER BY booking_date DESC
+        ''')
+
+    def search_bookings(self, term, after=None, before=None, limit=100):
+        # Prefix search on name, phone and room through bookings_fts, newest
+        # booking id first; `after` / `before` are booking ids for paging
+        match = fts_query(term)
+        if match is None:
+            return []
+        if after is not None:
+            bound, order = 'AND f.rowid < ?', 'DESC'
+            params = (match, after, limit)
+        elif before is not None:
+            bound, order = 'AND f.rowid > ?', 'ASC'
+            params = (match, before, limit)
+        else:
+            bound, order = '', 'DESC'
+            params = (match, limit)
+
+        rows = self._records(Booking, f'''
+            SELECT {columns(Booking, 'b')} FROM bookings_fts f
+            JOIN bookings b ON b.id = f.rowid
+            WHERE bookings_fts MATCH ? {bound}
+            ORDER BY f.rowid {order}
+            LIMIT ?
+        ''', params)
+        if order == 'ASC':
+            rows.reverse()
+        return rows
+
+    def booking_page(self, after=None, before=None, limit=100):
+        # Keyset pagination on (booking_date, id), newest first. `after` and
+        # `before` are the key of the last / first row already shown.
+        where, params = [], []
+        if after is not None:
+            where.append('(booking_date, id) < (?, ?)')
+            params.extend((to_epoch(after[0]), after[1]))
+        elif before is not None:
+            where.append('(booking_date, id) > (?, ?)')
+            params.extend((to_epoch(before[0]), before[1]))
+
+        order = 'ASC' if before is not None and after is None else 'DESC'
+        rows = self._records(Booking, f'''
+            SELECT {columns(Booking)} FROM bookings
+            {'WHERE ' + ' AND '.join(where) if where else ''}
+            ORDER BY booking_date {order}, id {order}
+            LIMIT ?
+        ''', params + [limit])
+        if order == 'ASC':
+            rows.reverse()
+        return rows
+
+    def book_room(self, room_number, customer_name, customer_phone, check_in, check_out, allow_past=False):
+        check_in_date = parse_date(check_in)
+        check_out_date = parse_date(check_out)
+
+        if check_in_date >= check_out_date:
+            raise ValueError("Check-out date must be after check-in date")
+
+        if not allow_past and check_in_date < date.today():
+            raise ValueError("Check-in date cannot be in the past")
+
+        # Take the write lock before the overlap check so two terminals
+        # cannot book the same nights
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Both checks read on the writer connection, inside the write
+            # transaction, never on a possibly older read_conn snapshot
+            room = self.conn.execute(
+                "SELECT rate, room_type FROM rooms WHERE room_number = ?", (room_number,)
+            ).fetchone()
+            if room is None:
+                raise ValueError(f"Room {room_number} does not exist")
+
+            if not self.room_is_free(room_number, check_in_date, check_out_date, conn=self.conn):
+                raise RoomBookedError(f"Room {room_number} is already booked for these dates")
+
+            # Calculate total amount (rates are stored in cents)
+            days = (check_out_date - check_in_date).days
+            total_amount = days * room[0]
+
+            # Save booking
+            booking_date = datetime.now()
+            cursor = self.conn.execute('''
+                INSERT INTO bookings (
+                    room_number, customer_name, customer_phone,
+                    check_in_date, check_out_date, total_amount, booking_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                room_number,
+                customer_name,
+                customer_phone,
+                to_day(check_in_date),
+                to_day(check_out_date),
+                total_amount,
+                to_epoch(booking_date)
+            ))
+            self.analytics.record_bookings([
+                (booking_date, total_amount, room[1], check_in_date, check_out_date)
+            ])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        if self._availability is not None:
+            self._availability.add_booking(room_number, check_in_date, check_out_date)
+        return cursor.lastrowid, from_cents(total_amount)
+
+    def insert_bookings(self, rows):
+        # rows: (room_number, customer_name, customer_phone, check_in_date,
+        #        check_out_date, total_amount, booking_date), one transaction
+        room_types = dict(self._query('SELECT room_number, room_type FROM rooms'))
+        rows = [row[:5] + (to_cents(row[5]),) + row[6:] for row in rows]
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO bookings (
+                    room_number, customer_name, customer_phone,
+                    check_in_date, check_out_date, total_amount, booking_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (row[:3] + (to_day(row[3]), to_day(row[4]), row[5], to_epoch(row[6])) for row in rows))
+            self.analytics.record_bookings(
+                (row[6], row[5], room_types.get(row[0]), row[3], row[4]) for row in rows
+            )
+        self._availability = None
+
+    def room_rates(self):
+        return {
+            str(room_number): from_cents(rate)
+            for room_number, rate in self._query('SELECT room_number, rate FROM rooms')
+        }
+
+    def list_unbilled_bookings(self):
+        # billed is kept by triggers on bills; served by idx_bookings_unbilled
+        return self._records(Booking, f'''
+            SELECT {columns(Booking)}
+            FROM bookings
+            WHERE billed = 0
+            ORDER BY booking_date DESC
+        ''')
+
+    def get_booking(self, booking_id):
+        return self._record(Booking, f"SELECT {columns(Booking)} FROM bookings WHERE id = ?", (booking_id,))
+
+    def list_active_bookings(self, today=None):
+        return self._records(Booking, f'''
+            SELECT {columns(Booking)}
+            FROM bookings
+            WHERE check_out_date >= ?
+            ORDER BY check_in_date DESC
+        ''', (to_day(today or date.today()),))
+
+    def invoice_lines(self, start=None, end=None, booking_ids=None):
+        # Everything an invoice needs in one pass: one row per service request
+        # (or a single row when there are none) with the booking, its room and
+        # its latest bill, ordered by booking id. Bookings are picked by
+        # check-out date (start..end inclusive, queried as the half-open day
+        # range [start, end + 1)) and/or id. Rows are streamed so month-end
+        # batches don't load into memory.
+        conditions, params = [], []
+        if start is not None:
+            conditions.append('b.check_out_date >= ?')
+            params.append(to_day(parse_date(start)))
+        if end is not None:
+            conditions.append('b.check_out_date < ?')
+            params.append(to_day(parse_date(end)) + 1)
+        if booking_ids is not None:
+            conditions.append('b.id IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps([int(booking_id) for booking_id in booking_ids]))
+        where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+        cursor = self.read_conn.execute(f'''
+            SELECT b.id, b.room_number, r.room_type, b.customer_name, b.customer_phone,
+                   b.check_in_date, b.check_out_date, b.total_amount,
+                   bi.subtotal, bi.tax_amount, bi.discount_amount, bi.total_amount,
+                   bi.payment_method, bi.payment_status, bi.bill_date,
+                   s.service_name, sr.quantity, sr.total_amount, sr.request_date
+            FROM bookings b
+            LEFT JOIN rooms r ON r.room_number = b.room_number
+            LEFT JOIN bills bi ON bi.id = (
+                SELECT MAX(id) FROM bills WHERE booking_id = b.id
+            )
+            LEFT JOIN service_requests sr ON sr.booking_id = b.id
+            LEFT JOIN services s ON s.id = sr.service_id
+            {where}
+            ORDER BY b.id, sr.request_date, sr.id
+        ''', params)
+        return (_with_days(_with_money(row, (7, 8, 9, 10, 11, 17)), (5, 6)) for row in cursor)
+
+    # Bills
+    def folio(self, booking_id, discount=0):
+        # Room charges plus all service requests for one booking, in a single
+        # grouped lookup (primary key + idx_service_requests_booking)
+        row = self._query_one('''
+            SELECT b.id, b.room_number, b.customer_name, b.total_amount,
+                   COALESCE(SUM(sr.total_amount), 0), COUNT(sr.id)
+            FROM bookings b
+            LEFT JOIN service_requests sr ON sr.booking_id = b.id
+            WHERE b.id = ?
+            GROUP BY b.id
+        ''', (booking_id,), money=(3, 4))
+        if row is None:
+            return None
+        return Folio(*row, discount=discount)
+
+    def bill_folio(self, folio, payment_method, payment_status='Paid'):
+        return self.create_bill(
+            folio.booking_id,
+            folio.subtotal,
+            folio.tax,
+            folio.discount,
+            folio.total,
+            payment_method,
+            payment_status
+        )
+
+    def create_bill(self, booking_id, subtotal, tax_amount, discount_amount, total_amount,
+                    payment_method, payment_status='Paid'):
+        bill_date = datetime.now()
+        subtotal, tax_amount, discount_amount, total_amount = (
+            to_cents(subtotal), to_cents(tax_amount), to_cents(discount_amount), to_cents(total_amount)
+        )
+        # The billed check and the insert share one write transaction, so two
+        # terminals cannot both bill the same booking
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            booking = self.conn.execute("SELECT billed FROM bookings WHERE id = ?", (booking_id,)).fetchone()
+            if booking is None:
+                raise ValueError(f"Booking {booking_id} does not exist")
+            if booking[0]:
+                raise AlreadyBilledError(f"Booking {booking_id} has already been billed")
+
+            cursor = self.conn.execute('''
+                INSERT INTO bills (
+                    booking_id, subtotal, tax_amount, discount_amount,
+                    total_amount, payment_status, payment_method, bill_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                booking_id,
+                subtotal,
+                tax_amount,
+                discount_amount,
+                total_amount,
+                payment_status,
+                payment_method,
+                bill_date
+            ))
+            self.analytics.record_bills([
+                (bill_date, total_amount, tax_amount, discount_amount, payment_method)
+            ])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return cursor.lastrowid
+
+    # Services
+    def list_available_services(self):
+        return self._records(Service, f'''
+            SELECT {columns(Service)}
+            FROM services
+            WHERE is_active = 1
+            ORDER BY category, service_name
+        ''')
+
+    def list_all_services(self):
+        return self._records(Service, f'''
+            SELECT {columns(Service)}
+            FROM services
+            ORDER BY category, service_name
+        ''')
+
+    def get_service_id(self, service_name):
+        row = self._query_one('SELECT id FROM services WHERE service_name = ?', (service_name,))
+        return row[0] if row else None
+
+    def add_service(self, service_name, category, price, description):
+        self._execute('''
+            INSERT INTO services (service_name, category, price, description, is_active)
+            VALUES (?, ?, ?, ?, 1)
+        ''', (service_name, category, to_cents(price), description))
+
+    def update_service(self, service_id, service_name, category, price, description):
+        self._execute('''
+            UPDATE services
+            SET service_name = ?, category = ?, price = ?, description = ?
+            WHERE id = ?
+        ''', (service_name, category, to_cents(price), description, service_id))
+
+    def set_service_active(self, service_id, is_active):
+        self._execute('''
+            UPDATE services
+            SET is_active = ?
+            WHERE id = ?
+        ''', (1 if is_active else 0, service_id))
+
+    # Service requests
+    def create_service_request(self, booking_id, service_id, quantity, total_amount, notes="",
+                               status='Pending'):
+        cursor = self._execute('''
+            INSERT INTO service_requests (
+                booking_id, service_id, quantity, total_amount,
+                request_date, status, notes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            booking_id,
+            service_id,
+            quantity,
+            to_cents(total_amount),
+            datetime.now(),
+            status,
+            notes
+        ))
+        return cursor.lastrowid
+
+    def list_service_history(self):
+        return self._query('''
+            SELECT
+                sr.request_date,
+                b.room_number,
+                b.customer_name,
+                s.service_name,
+                sr.quantity,
+                sr.total_amount,
+                sr.status,
+                sr.notes
+            FROM service_requests sr
+            JOIN bookings b ON sr.booking_id = b.id
+            JOIN services s ON sr.service_id = s.id
+            ORDER BY sr.request_date DESC
+        ''', money=(5,))
+
+    # Staff
+    def list_staff(self):
+        return self._records(Staff, f'SELECT {columns(Staff)} FROM staff ORDER BY name')
+
+    def add_staff(self, employee_id, name, position, phone, email, address, join_date,
+                  base_salary, status):
+        self._execute('''
+            INSERT INTO staff (
+                employee_id, name, position, phone, email,
+                address, join_date, base_salary, status
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            employee_id,
+            name,
+            position,
+            phone,
+            email,
+            address,
+            parse_date(join_date).isoformat(),
+            to_cents(base_salary),
+            status
+        ))
+
+    def create_salary_payment(self, employee_id, base_salary, bonus, deductions, payment_method,
+                              remarks=""):
+        base_salary, bonus, deductions = to_cents(base_salary), to_cents(bonus), to_cents(deductions)
+        net_salary = base_salary + bonus - deductions
+        self._execute('''
+            INSERT INTO salary_payments (
+                employee_id, payment_date, base_salary, bonus,
+                deductions, net_salary, payment_method, remarks
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            employee_id,
+            datetime.now().strftime('%Y-%m-%d'),
+            base_salary,
+            bonus,
+            deductions,
+            net_salary,
+            payment_method,
+            remarks
+        ))
+        return from_cents(net_salary)
+
+    def list_salary_payments(self, employee_id):
+        return self._records(SalaryPayment, f'''
+            SELECT {columns(SalaryPayment)}
+            FROM salary_payments
+            WHERE employee_id = ?
+            ORDER BY payment_date DESC
+        ''', (employee_id,))
+
+    # Change feed
+    def change_version(self):
+        return self.changes.latest_version()
+
+    def changes_since(self, version):
+        # (new version, {table: {row id: op}}) for writes after `version`
+        version, changes = self.changes.since(version)
+        self._apply_availability_changes(changes)
+        return version, changes
+
+    # Analytics, read from the daily rollups
+    def booking_summary(self, start, end):
+        return self.analytics.summary(start, end)
+
+    def booking_trends(self, months=6, today=None):
+        return self.analytics.monthly_bookings(_months_ago(months, today))
+
+    def revenue_by_month(self, months=12, today=None):
+        return self.analytics.monthly_revenue(_months_ago(months, today))
+
+    def occupancy_by_period(self, start, end, period='month'):
+        return self.occupancy.by_period(start, end, period)
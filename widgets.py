@@ -0,0 +1,251 @@
+import tkinter as tk
+
+
+# Keyset-paginated Treeview loading: fetches the next page as the user
+# scrolls and keeps at most `max_rows` rows in the widget at a time.
+#
+# fetch(page, done) loads rows in display order that come after (or before)
+# the row with the given key, page being {'after': key, 'before': key,
+# 'limit': n}, and calls done(rows) on the Tk thread once they arrive (or
+# done(None) if the load failed), so the query can run off the event loop.
+# key(row) returns that key and values(row) the Treeview column values.
+class PagedTreeview:
+    def __init__(self, tree, fetch, key, values, scrollbar=None, page_size=100, max_rows=500):
+        self.tree = tree
+        self.fetch = fetch
+        self.key = key
+        self.values = values
+        self.scrollbar = scrollbar
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)
+        self.keys = {}
+        self.has_newer = False
+        self.has_older = False
+        self._loading = False
+        self._generation = 0  # pages requested before the last reset are dropped
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+    def reset(self, fetch=None, key=None):
+        if fetch is not None:
+            self.fetch = fetch
+        if key is not None:
+            self.key = key
+        self._generation += 1
+        self._loading = True
+        self._load({'limit': self.page_size}, self._first_page)
+
+    def _load(self, page, show):
+        generation = self._generation
+
+        def done(rows):
+            if generation != self._generation or not self.tree.winfo_exists():
+                return
+            if rows is None:
+                self._loading = False
+                return
+            try:
+                show(rows)
+            finally:
+                self._loading = False
+
+        self.fetch(page, done)
+
+    def _first_page(self, rows):
+        self.tree.delete(*self.tree.get_children())
+        self.keys = {}
+        self.has_newer = False
+        self.has_older = len(rows) == self.page_size
+        for row in rows:
+            self._insert(tk.END, row)
+
+    def _insert(self, index, row):
+        key = self.key(row)
+        iid = self.tree.insert('', index, values=self.values(row))
+        self.keys[iid] = key
+
+    def _delete(self, items):
+        self.tree.delete(*items)
+        for iid in items:
+            del self.keys[iid]
+
+    def _on_scroll(self, first, last):
+        if self.scrollbar is not None:
+            self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) >= 0.95 and self.has_older:
+            self._loading = True
+            self.tree.after_idle(self.load_older)
+        elif float(first) <= 0.05 and self.has_newer:
+            self._loading = True
+            self.tree.after_idle(self.load_newer)
+
+    def load_older(self):
+        children = self.tree.get_children()
+        if not children:
+            self._loading = False
+            return
+        self._load({'after': self.keys[children[-1]], 'limit': self.page_size}, self._older_page)
+
+    def _older_page(self, rows):
+        self.has_older = len(rows) == self.page_size
+        for row in rows:
+            self._insert(tk.END, row)
+
+        # Drop rows scrolled far out of view at the top
+        children = self.tree.get_children()
+        excess = len(children) - self.max_rows
+        if excess > 0:
+            self._delete(children[:excess])
+            self.has_newer = True
+            self.tree.see(children[-len(rows) - 1] if rows else children[-1])
+
+    def load_newer(self):
+        children = self.tree.get_children()
+        if not children:
+            self._loading = False
+            return
+        self._load({'before': self.keys[children[0]], 'limit': self.page_size}, self._newer_page)
+
+    def _newer_page(self, rows):
+        self.has_newer = len(rows) == self.page_size
+        for index, row in enumerate(rows):
+            self._insert(index, row)
+
+        # Drop rows scrolled far out of view at the bottom
+        children = self.tree.get_children()
+        excess = len(children) - self.max_rows
+        if excess > 0:
+            self._delete(children[-excess:])
+            self.has_older = True
+            self.tree.see(children[len(rows)] if rows else children[0])
+
+
+# Keeps a Treeview in step with rows identified by key(row): sync() applies
+# only the inserts, moves, updates and deletes needed to match a fresh list,
+# and upsert()/remove() apply a single known change, so one payment on a
+# long list touches one row instead of rebuilding the widget.
+class TableBinding:
+    def __init__(self, tree, key, values):
+        self.tree = tree
+        self.key = key
+        self.values = values
+        self.items = {}   # key -> Treeview item id
+        self.shown = {}   # key -> values currently displayed
+        self.keys = {}    # Treeview item id -> key
+        self.rows = {}    # key -> row currently displayed
+
+    def key_of(self, iid):
+        return self.keys.get(iid)
+
+    def row_of(self, iid):
+        # The row (record) behind a Treeview item, with its typed values
+        return self.rows.get(self.keys.get(iid))
+
+    def sync(self, rows):
+        wanted = {}
+        for row in rows:
+            wanted[self.key(row)] = row
+
+        for key in [key for key in self.items if key not in wanted]:
+            self.remove(key)
+
+        children = list(self.tree.get_children())
+        for index, (key, row) in enumerate(wanted.items()):
+            iid = self.items.get(key)
+            if iid is None:
+                iid = self._insert(key, row, index)
+                children.insert(index, iid)
+                continue
+            self._update(key, row)
+            if children[index] != iid:
+                self.tree.move(iid, '', index)
+                children.remove(iid)
+                children.insert(index, iid)
+
+    def upsert(self, row, index=tk.END):
+        key = self.key(row)
+        if key in self.items:
+            self._update(key, row)
+        else:
+            self._insert(key, row, index)
+
+    def remove(self, key):
+        iid = self.items.pop(key, None)
+        if iid is not None:
+            self.tree.delete(iid)
+            del self.shown[key]
+            del self.keys[iid]
+            del self.rows[key]
+
+    def _insert(self, key, row, index):
+        values = tuple(self.values(row))
+        iid = self.tree.insert('', index, values=values)
+        self.items[key] = iid
+        self.shown[key] = values
+        self.keys[iid] = key
+        self.rows[key] = row
+        return iid
+
+    def _update(self, key, row):
+        self.rows[key] = row
+        values = tuple(self.values(row))
+        if self.shown[key] != values:
+            self.tree.item(self.items[key], values=values)
+            self.shown[key] = values
+
+
+# Top-level screens built once and kept: switching hides the current
+# screen's frame and packs the cached one, so going back to a screen costs
+# a pack instead of rebuilding its widgets and re-running its queries.
+#
+# build(frame) fills a new screen's frame; refresh() reloads its data and
+# is called on return if one of `tables` changed while it was hidden.
+class ScreenManager:
+    def __init__(self, parent, **frame_options):
+        self.parent = parent
+        self.frame_options = frame_options
+        self.screens = {}
+        self.current = None
+
+    def show(self, name, build, refresh=None, tables=()):
+        screen = self.screens.get(name)
+        if self.current is not None and self.current is not screen:
+            self.current.frame.pack_forget()
+
+        if screen is None:
+            screen = _Screen(tk.Frame(self.parent, **self.frame_options), refresh, tables)
+            self.screens[name] = screen
+            self.current = screen
+            screen.frame.pack(fill=tk.BOTH, expand=True)
+            build(screen.frame)
+            return screen.frame
+
+        self.current = screen
+        screen.frame.pack(fill=tk.BOTH, expand=True)
+        if screen.stale:
+            screen.stale = False
+            if screen.refresh is not None:
+                screen.refresh()
+        return screen.frame
+
+    def showing(self, widget):
+        # True if `widget` is part of the screen on display
+        if self.current is None:
+            return False
+        path = str(self.current.frame)
+        return str(widget) == path or str(widget).startswith(path + '.')
+
+    def mark_stale(self, tables):
+        # Hidden screens showing any of `tables` refresh when shown again
+        for screen in self.screens.values():
+            if screen is not self.current and screen.tables.intersection(tables):
+                screen.stale = True
+
+
+class _Screen:
+    def __init__(self, frame, refresh, tables):
+        self.frame = frame
+        self.refresh = refresh
+        self.tables = set(tables)
+        self.stale = False